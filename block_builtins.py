@@ -1,28 +1,38 @@
-import sys, math
+import sys, math, types
+from array import array
 class BlockError(Exception):
     """Custom exception for Block language transpilation errors"""
     pass
 
-BUILTIN_TYPES = ("str", "num", "boolean", "list", "tuple", "set", "map", "func", "none")
+BUILTIN_TYPES = frozenset(("str", "num", "boolean", "list", "tuple", "set", "map", "func", "none"))
 BUILTIN_COLLECTIONS = ("list", "tuple", "set", "map", "str")
-BUILTIN_FUNCTIONS = ['exit']
+BUILTIN_FUNCTIONS_ORDERED = ['exit']
 BUILTIN_CONSTANTS = {        
-        'true': ('boolean', 'boolean(True)'),
-        'false': ('boolean', 'boolean()'),
+        'true': ('boolean', 'TRUE'),
+        'false': ('boolean', 'FALSE'),
         'none': ('none', 'NONE'),
     }
+_NUM = (int, float)
 
 class boolean(int):
-    def __init__(self, value=False) -> None:
-        self.value = bool(value)
+    __slots__ = ()
+    _values = ()
+    def __new__(cls, value=False):
+        if cls._values: return cls._values[1 if value else 0]
+        return int.__new__(cls, 1 if value else 0)
     
     def __repr__(self) -> str:
-        return self.value.__str__().lower()
+        return "true" if self else "false"
 
-    def __str__(self) -> str:
-        return self.__repr__()
+    __str__ = __repr__
+FALSE = boolean(False)
+TRUE = boolean(True)
+boolean._values = (FALSE, TRUE)
+
+def _bool(x): return TRUE if x else FALSE
 
 class none:
+    __slots__ = ()
     _instance = None
     def __new__(cls):
         if cls._instance is None: cls._instance = super().__new__(cls)
@@ -30,117 +40,119 @@ class none:
     def __repr__(self): return "none"
     __str__ = __repr__
     def __bool__(self): return False
-    def __eq__(self, other): return other is None or isinstance(other, none)
+    def __eq__(self, other): return other is self or other is None
+    def __ne__(self, other): return not (other is self or other is None)
+    def __hash__(self): return hash(None)
 NONE = none()
 
-def _isString(obj, func): 
-    if not isinstance(obj, str):
-        raise BlockError(func.__name__ + " expects 'str'.")
-    return True
-
-def _isNum(obj, func):
-    if not isinstance(obj, (int, float)):
-        raise BlockError(func.__name__ + " expects 'num'.")
-    return True
-
-def _isList(obj, func):
-    if not isinstance(obj, list):
-        raise BlockError(func.__name__ + " expects 'list'.")
-    return True
-
-def _isTuple(obj, func):
-    if not isinstance(obj, tuple):
-        raise BlockError(func.__name__ + " expects 'tuple'.")
-    return True
-
-def _isSet(obj, func):
-    if not isinstance(obj, set):
-        raise BlockError(func.__name__ + " expects 'set'.")
-    return True
+class NumList(array):
+    __slots__ = ()
+    def __new__(cls, items=()): return array.__new__(cls, 'd', items)
+    def __repr__(self): return repr(self.tolist())
+    __str__ = __repr__
 
-def _isMap(obj, func):
-    if not isinstance(obj, dict):
-        raise BlockError(func.__name__ + " expects 'map'.")
-    return True
 
 def builtin(func):
-    BUILTIN_FUNCTIONS.append(func.__name__)
+    BUILTIN_FUNCTIONS_ORDERED.append(func.__name__)
     return func
 
 @builtin
 def echo(*args, **kwargs): print(*args, **kwargs)
 
-@builtin
-def typeOf(obj):
-    t = 'none'
-    if isinstance(obj, str): return "str"
-    if isinstance(obj, boolean): return "boolean"
-    if isinstance(obj, bool): return "boolean"
-    if isinstance(obj, (int, float)): return "num"
-    if isinstance(obj, list): return "list"
-    if isinstance(obj, tuple): return "tuple"
-    if isinstance(obj, set): return "set"
-    if isinstance(obj, dict): return "map"
-    if callable(obj): return "func"
-    if getattr(
-            getattr(
-                obj,
-                "__class__", {}
-                ),
-            "__name__",  ""
-        ).__contains__("function"): t="func"
-    return f"{t}"
+_TYPE_TAGS = {
+    str: "str", bool: "boolean", boolean: "boolean", int: "num", float: "num",
+    list: "list", NumList: "list", tuple: "tuple", set: "set", frozenset: "set", dict: "map",
+    none: "none", type(None): "none",
+}
+_CALLABLE_TYPES = (types.FunctionType, types.BuiltinFunctionType, types.BuiltinMethodType, types.MethodType)
+_TYPE_TAGS.update(dict.fromkeys(_CALLABLE_TYPES, "func"))
+_TYPEOF_CACHE = dict(_TYPE_TAGS)
+
+def _typeOf_slow(obj):
+    tp = type(obj)
+    for base in tp.__mro__:
+        t = _TYPE_TAGS.get(base)
+        if t is not None: break
+    else: t = "func" if isinstance(obj, _CALLABLE_TYPES) or callable(obj) else "none"
+    _TYPEOF_CACHE[tp] = t
+    return t
+
+@builtin
+def typeOf(obj): return _TYPEOF_CACHE.get(type(obj)) or _typeOf_slow(obj)
+
+_K_STR, _K_LIST, _K_TUPLE, _K_SET, _K_MAP = range(5)
+_KIND = {
+    str: _K_STR, list: _K_LIST, NumList: _K_LIST, tuple: _K_TUPLE,
+    set: _K_SET, frozenset: _K_SET, dict: _K_MAP,
+}
+_KIND_BY_TAG = {"str": _K_STR, "list": _K_LIST, "tuple": _K_TUPLE, "set": _K_SET, "map": _K_MAP}
+_INDEXABLE = frozenset((_K_STR, _K_LIST, _K_TUPLE))
+_COLLECTION_ERR = ", ".join(BUILTIN_COLLECTIONS)
+_INDEXABLE_ERR = ", ".join(t for t in BUILTIN_COLLECTIONS if _KIND_BY_TAG[t] in _INDEXABLE)
+
+def _kind(obj):
+    k = _KIND.get(type(obj))
+    return k if k is not None else _KIND_BY_TAG.get(typeOf(obj), -1)
 
 @builtin
 def lenOf(obj):
-    if typeOf(obj) in BUILTIN_COLLECTIONS: return len(obj)
-    else: raise BlockError(f"lenOf: requires one of {', '.join(BUILTIN_COLLECTIONS)}")
+    if _kind(obj) >= 0: return len(obj)
+    else: raise BlockError(f"lenOf: requires one of {_COLLECTION_ERR}")
 
+_STR_FAST = {
+    str: str.__str__, int: int.__repr__, float: float.__repr__,
+    boolean: lambda o: "true" if o else "false", none: lambda o: "none",
+}
 @builtin
-def toStr(obj): return str(obj)
+def toStr(obj):
+    fn = _STR_FAST.get(type(obj))
+    return fn(obj) if fn is not None else str(obj)
 
 @builtin
 def toNum(obj):
+    """Whole numbers come back as int (10, "10"), anything else as float (2.5, "1e3")"""
+    if isinstance(obj, int): return int(obj)
+    if isinstance(obj, float): return obj
+    if isinstance(obj, str):
+        s = obj.strip()
+        digits = s[1:] if s[:1] in ('-', '+') else s
+        if digits.isdecimal(): return int(s)
     try: return float(obj)
-    except: raise BlockError("toNum: cannot convert to number.")
+    except (TypeError, ValueError): raise BlockError("toNum: cannot convert to number.")
 
 @builtin
 def toList(obj):
-    if typeOf(obj) in BUILTIN_COLLECTIONS:
-        if typeOf(obj) == 'str': return [i for i in obj]
-        elif typeOf(obj) == 'map': return list(obj.items())
-        else: return list(obj)
-    else: raise BlockError(f"toList: Cannot convert object of type '{typeOf(obj)}' to list!")
+    k = _kind(obj)
+    if k == _K_MAP: return list(obj.items())
+    if k >= 0: return list(obj)
+    raise BlockError(f"toList: Cannot convert object of type '{typeOf(obj)}' to list!")
 
 @builtin
 def toTuple(obj):
-    if typeOf(obj) in BUILTIN_COLLECTIONS:
-        if typeOf(obj) == 'str': return tuple([i for i in obj])
-        elif typeOf(obj) == 'map': return tuple(obj.items())
-        else: return tuple(obj)
-    else: raise BlockError(f"toTuple: Cannot convert object of type '{typeOf(obj)}' to tuplr!")
+    k = _kind(obj)
+    if k == _K_MAP: return tuple(obj.items())
+    if k >= 0: return tuple(obj)
+    raise BlockError(f"toTuple: Cannot convert object of type '{typeOf(obj)}' to tuplr!")
 
 @builtin
 def toSet(obj):
-    t = typeOf(obj)
-    if t == 'set': return obj
-    if t == 'str': return {ch for ch in obj}
-    if t == 'list' or t == 'tuple':
+    k = _kind(obj)
+    if k == _K_SET: return obj if isinstance(obj, set) else set(obj)
+    if k == _K_STR: return set(obj)
+    if k == _K_LIST or k == _K_TUPLE:
         try: return set(obj)
         except TypeError: raise BlockError("toSet: elements must be hashable to convert to set.")
-    if t == 'map':
-        for k, v in obj.items():
-            try: hash((k, v))
-            except TypeError: raise BlockError("toSet: cannot convert map to set; key/value not hashable.")
-        return set(obj.items())
-    raise BlockError(f"toSet: Cannot convert object of type '{t}' to set!")
+    if k == _K_MAP:
+        try: return set(obj.items())
+        except TypeError: raise BlockError("toSet: cannot convert map to set; key/value not hashable.")
+    raise BlockError(f"toSet: Cannot convert object of type '{typeOf(obj)}' to set!")
 
 @builtin
 def toMap(obj):
-    t = typeOf(obj)
-    if t == 'map': return obj
-    if t == 'str': return {i:ch for i, ch in enumerate(obj)}
-    if t in ('list', 'tuple'):
+    k = _kind(obj)
+    if k == _K_MAP: return obj
+    if k == _K_STR: return dict(enumerate(obj))
+    if k == _K_LIST or k == _K_TUPLE:
         result = {}
         for item in obj:
             if not isinstance(item, (list, tuple)) or len(item) != 2:
@@ -150,88 +162,133 @@ def toMap(obj):
             except Exception: raise BlockError("toMap: key must be str, tuple or num.")
             result[key] = value
         return result
-    if t == 'set': raise BlockError("toMap: cannot convert set to map due to hashability issues.")
-    raise BlockError(f"toMap: Cannot convert object of type '{t}' to map!")
+    if k == _K_SET: raise BlockError("toMap: cannot convert set to map due to hashability issues.")
+    raise BlockError(f"toMap: Cannot convert object of type '{typeOf(obj)}' to map!")
+
+@builtin
+def toBool(obj): return _bool(obj)
 
 @builtin
-def toBool(obj): return boolean(obj)
+def toNumList(obj):
+    try: return NumList(obj)
+    except TypeError: raise BlockError("toNumList: all elements must be of type 'num'.")
 
 # String operations
 @builtin
-def strStrip(obj: str): return obj.strip() if _isString(obj, strStrip) else ""
+def strStrip(obj: str):
+    if isinstance(obj, str): return obj.strip()
+    raise BlockError("strStrip expects 'str'.")
 @builtin
-def strLStrip(obj: str): return obj.lstrip() if _isString(obj, strLStrip) else ""
+def strLStrip(obj: str):
+    if isinstance(obj, str): return obj.lstrip()
+    raise BlockError("strLStrip expects 'str'.")
 @builtin
-def strRStrip(obj: str): return obj.rstrip() if _isString(obj, strRStrip) else ""
+def strRStrip(obj: str):
+    if isinstance(obj, str): return obj.rstrip()
+    raise BlockError("strRStrip expects 'str'.")
 @builtin
-def strReplace(obj: str, old, new): return obj.replace(old, new) if _isString(obj, strReplace) else ""
+def strReplace(obj: str, old, new):
+    if isinstance(obj, str): return obj.replace(old, new)
+    raise BlockError("strReplace expects 'str'.")
 @builtin
-def strStartsWith(obj: str, prefix): return boolean(obj.startswith(prefix)) if _isString(obj, strStartsWith) else boolean()
+def strStartsWith(obj: str, prefix):
+    if isinstance(obj, str): return _bool(obj.startswith(prefix))
+    raise BlockError("strStartsWith expects 'str'.")
 @builtin
-def strEndsWith(obj: str, suffix): return boolean(obj.endswith(suffix)) if _isString(obj, strEndsWith) else boolean()
+def strEndsWith(obj: str, suffix):
+    if isinstance(obj, str): return _bool(obj.endswith(suffix))
+    raise BlockError("strEndsWith expects 'str'.")
 @builtin
-def strFind(obj: str, substring): return obj.find(substring) if _isString(obj, strFind) else -1
+def strFind(obj: str, substring):
+    if isinstance(obj, str): return obj.find(substring)
+    raise BlockError("strFind expects 'str'.")
 @builtin
-def strLen(obj: str): return len(obj) if _isString(obj, strLen) else 0
+def strLen(obj: str):
+    if isinstance(obj, str): return len(obj)
+    raise BlockError("strLen expects 'str'.")
 @builtin
-def strToUpper(obj): return obj.upper() if _isString(obj, strToUpper) else ""
+def strToUpper(obj):
+    if isinstance(obj, str): return obj.upper()
+    raise BlockError("strToUpper expects 'str'.")
 @builtin
-def strToLower(obj): return obj.lower() if _isString(obj, strToLower) else ""
+def strToLower(obj):
+    if isinstance(obj, str): return obj.lower()
+    raise BlockError("strToLower expects 'str'.")
 @builtin
-def strToTitle(obj): return obj.title() if _isString(obj, strToTitle) else ""
+def strToTitle(obj):
+    if isinstance(obj, str): return obj.title()
+    raise BlockError("strToTitle expects 'str'.")
 @builtin
 def strToCapital(obj):
-    if _isString(obj, strToCapital): return obj.capitalize()
-    return ""
+    if isinstance(obj, str): return obj.capitalize()
+    raise BlockError("strToCapital expects 'str'.")
 @builtin
-def strSwapCase(obj): return obj.swapcase() if _isString(obj, strSwapCase) else ""
+def strSwapCase(obj):
+    if isinstance(obj, str): return obj.swapcase()
+    raise BlockError("strSwapCase expects 'str'.")
 @builtin
-def strSplit(obj, sep=None): return obj.split(sep) if _isString(obj, strSplit) else []
+def strSplit(obj, sep=None):
+    if isinstance(obj, str): return obj.split(sep)
+    raise BlockError("strSplit expects 'str'.")
 @builtin
-def strCount(obj, sub): return obj.count(sub) if _isString(obj, strCount) else 0
+def strCount(obj: str, sub):
+    if isinstance(obj, str): return obj.count(sub)
+    raise BlockError("strCount expects 'str'.")
 @builtin
 def strEncode(obj, encoding='utf-8'):
-    if _isString(obj, strEncode):
-        try: return str(obj.encode(encoding))
-        except Exception: raise BlockError(f"strEncode: invalid encoding '{encoding}'.")
-    return ""
+    if not isinstance(obj, str): raise BlockError("strEncode expects 'str'.")
+    try: return str(obj.encode(encoding))
+    except Exception: raise BlockError(f"strEncode: invalid encoding '{encoding}'.")
 
 # Number Operations
+_floor, _ceil, _trunc, _sqrt, _cbrt = math.floor, math.ceil, math.trunc, math.sqrt, math.cbrt
+
 @builtin
-def numAbs(x): return abs(x) if _isNum(x, numAbs) else 0
+def numAbs(x):
+    if isinstance(x, _NUM): return abs(x)
+    raise BlockError("numAbs expects 'num'.")
 @builtin
-def numRound(x, ndigits=0): return round(x, int(ndigits)) if _isNum(x, numRound) else 0
+def numRound(x, ndigits=0):
+    if isinstance(x, _NUM): return round(x, int(ndigits))
+    raise BlockError("numRound expects 'num'.")
 @builtin
 def numFloor(x):
-    if _isNum(x, numFloor): return math.floor(x)
+    if isinstance(x, _NUM): return _floor(x)
+    raise BlockError("numFloor expects 'num'.")
 @builtin
 def numCeil(x):
-    if _isNum(x, numCeil): return math.ceil(x)
+    if isinstance(x, _NUM): return _ceil(x)
+    raise BlockError("numCeil expects 'num'.")
 @builtin
 def numTrunc(x):
-    if _isNum(x, numTrunc): return math.trunc(x)
+    if isinstance(x, _NUM): return _trunc(x)
+    raise BlockError("numTrunc expects 'num'.")
 @builtin
 def numPow(a, b, mod=None):
-    if _isNum(a, numPow) and _isNum(b, numPow):
-        if mod is None:return pow(a, b)
-        else:
-            try:return pow(int(a), int(b), int(mod))
-            except Exception: raise BlockError(
-                "numPow: for modulus variant, a, b, mod must be integer-convertible."
-                )
+    if not (isinstance(a, _NUM) and isinstance(b, _NUM)): raise BlockError("numPow expects 'num'.")
+    if mod is None:return pow(a, b)
+    try:return pow(int(a), int(b), int(mod))
+    except Exception: raise BlockError(
+        "numPow: for modulus variant, a, b, mod must be integer-convertible."
+        )
 @builtin
 def numSqrt(x):
-    if _isNum(x, numSqrt):
-        if x < 0: return (0, math.sqrt(abs(x)))
-        return math.sqrt(x)
+    if isinstance(x, _NUM):
+        if x < 0: return (0, _sqrt(-x))
+        return _sqrt(x)
+    raise BlockError("numSqrt expects 'num'.")
 @builtin
 def numCbrt(x):
-    if _isNum(x, numCbrt): return math.cbrt(x)
+    if isinstance(x, _NUM): return _cbrt(x)
+    raise BlockError("numCbrt expects 'num'.")
 @builtin
 def numClamp(x, lo, hi):
-    if _isNum(x, numClamp) and _isNum(lo, numClamp) and _isNum(hi, numClamp): return max(lo, min(x, hi))
+    if isinstance(x, _NUM) and isinstance(lo, _NUM) and isinstance(hi, _NUM): return max(lo, min(x, hi))
+    raise BlockError("numClamp expects 'num'.")
 @builtin
-def numSign(x): return (-1 if x < 0 else (1 if x > 0 else 0)) if _isNum(x, numSign) else 0
+def numSign(x):
+    if isinstance(x, _NUM): return (x > 0) - (x < 0)
+    raise BlockError("numSign expects 'num'.")
 @builtin
 def numMin(x, y): return min(x, y)
 @builtin
@@ -244,59 +301,77 @@ def numOct(x): return oct(x)
 def numHex(x): return hex(x)
 
 # List operations
+_LISTS = (list, NumList)
+_NUMLIST_ERR = ": a NumList only holds 'num' values."
 @builtin
 def listAppend(lst, value):
-    if _isList(lst, listAppend):
-        lst.append(value)
-        return lst
+    if not isinstance(lst, _LISTS): raise BlockError("listAppend expects 'list'.")
+    try: lst.append(value)
+    except TypeError: raise BlockError("listAppend" + _NUMLIST_ERR)
+    return lst
 @builtin
 def listPop(lst, index=-1):
-    if _isList(lst, listPop): return lst.pop(index)
+    if isinstance(lst, _LISTS): return lst.pop(index)
+    raise BlockError("listPop expects 'list'.")
 @builtin
 def listExtend(lst, items):
-    if _isList(lst, listExtend) and isinstance(items, list):
-        lst.extend(items)
+    if not isinstance(lst, _LISTS): raise BlockError("listExtend expects 'list'.")
+    if isinstance(items, _LISTS):
+        if type(lst) is list: lst += items
+        else:
+            try: lst.extend(items)
+            except TypeError: raise BlockError("listExtend" + _NUMLIST_ERR)
         return lst
 
 # Set operations
 @builtin
 def setAdd(s, value):
-    if _isSet(s, setAdd):
-        s.add(value)
-        return s
+    if not isinstance(s, set): raise BlockError("setAdd expects 'set'.")
+    s.add(value)
+    return s
 @builtin
 def setRemove(s, value):
-    if _isSet(s, setRemove):
-        s.remove(value)
-        return s
+    if not isinstance(s, set): raise BlockError("setRemove expects 'set'.")
+    s.remove(value)
+    return s
 
 # Map operations
 @builtin
-def mapGet(m, key, default=None): return m.get(key, default) if _isMap(m, mapGet) else none()
+def mapGet(m, key, default=None):
+    if isinstance(m, dict): return m.get(key, default)
+    raise BlockError("mapGet expects 'map'.")
 @builtin
 def mapSet(m, key, value):
-    if _isMap(m, mapSet):
-        m[key] = value
-        return m
+    if not isinstance(m, dict): raise BlockError("mapSet expects 'map'.")
+    m[key] = value
+    return m
 @builtin
 def mapKeys(m):
-    return list(m.keys()) if _isMap(m, mapKeys) else []
+    if isinstance(m, dict): return list(m)
+    raise BlockError("mapKeys expects 'map'.")
 @builtin
 def mapValues(m):
-    return list(m.values()) if _isMap(m, mapValues) else []
+    if isinstance(m, dict): return list(m.values())
+    raise BlockError("mapValues expects 'map'.")
 @builtin
 def mapItems(m):
-    return list(m.items()) if _isMap(m, mapItems) else []
+    if isinstance(m, dict): return list(m.items())
+    raise BlockError("mapItems expects 'map'.")
+@builtin
+def mapItemsView(m):
+    if isinstance(m, dict): return m.items()
+    raise BlockError("mapItemsView expects 'map'.")
 
 # Collection Specific
 @builtin
 def colIsEmtpy(obj):
-    if typeOf(obj) not in BUILTIN_COLLECTIONS: 
-        raise BlockError(f"isEmtpy requires an obj of type {', '.join([i for i in BUILTIN_COLLECTIONS])}.")
-    return boolean(len(obj) == 0)
+    if _kind(obj) < 0: 
+        raise BlockError(f"isEmtpy requires an obj of type {_COLLECTION_ERR}.")
+    return _bool(len(obj) == 0)
 
 @builtin
 def colOfNums(start=0, stop=0, step=1, func=toNum):
+    """Inclusive range from start to stop; with the default func=toNum the items are ints"""
     try:
         start_i = int(start)
         stop_i = int(stop)
@@ -304,58 +379,56 @@ def colOfNums(start=0, stop=0, step=1, func=toNum):
     except Exception:
         raise BlockError("colOfNums: start, stop and step must be integers.")
     if step_i == 0: raise BlockError("colOfNums: step must not be zero.")
-    return tuple([func(i) for i in range(start_i, stop_i + step_i, step_i)])
+    rng = range(start_i, stop_i + step_i, step_i)
+    if func is toNum or func is int: return tuple(rng)
+    return tuple(map(func, rng))
+
+# Workers indexed by kind (_K_STR, _K_LIST, _K_TUPLE, _K_SET, _K_MAP).
+_FILTER_BY_KIND = (
+    lambda o, f: ''.join(filter(f, o)),
+    lambda o, f: list(filter(f, o)),
+    lambda o, f: tuple(filter(f, o)),
+    lambda o, f: set(filter(f, o)),
+    lambda o, f: toMap({k:v for k,v in o.items() if f(k,v)}),
+)
+_APPLY_BY_KIND = (
+    lambda o, f: ''.join(map(f, o)),
+    lambda o, f: list(map(f, o)),
+    lambda o, f: tuple(map(f, o)),
+    lambda o, f: set(map(f, o)),
+    lambda o, f: toMap({k:f(v) for k,v in o.items()}),
+)
 
 @builtin
 def colFilter(obj, func):
-    if typeOf(obj) in BUILTIN_COLLECTIONS:
-        if typeOf(obj) == 'map':
-            return toMap({k:v for k,v in obj.items() if func(k,v)})
-        elif typeOf(obj) == 'list':
-            return [i for i in obj if func(i)]
-        elif typeOf(obj) == 'tuple':
-            return (i for i in obj if func(i))
-        elif typeOf(obj) == 'set':
-            return {i for i in obj if func(i)}
-        elif typeOf(obj) == 'str':
-            return ''.join([i for i in obj if func(i)])
-    else:
-        raise BlockError(f"colFilter only accepts one of {', '.join([i for i in BUILTIN_COLLECTIONS])}.")
+    if not callable(func): raise BlockError("colFilter expects 'func'.")
+    kind = _kind(obj)
+    if kind >= 0: return _FILTER_BY_KIND[kind](obj, func)
+    raise BlockError(f"colFilter only accepts one of {_COLLECTION_ERR}.")
 
 @builtin
 def colApplyF(obj, func):
-    if typeOf(obj) in BUILTIN_COLLECTIONS:
-        if typeOf(obj) == 'map':
-            return toMap({k:func(v) for k,v in obj.items()})
-        elif typeOf(obj) == 'list':
-            return [func(i) for i in obj]
-        elif typeOf(obj) == 'tuple':
-            return (func(i) for i in obj)
-        elif typeOf(obj) == 'set':
-            return {func(i) for i in obj}
-        elif typeOf(obj) == 'str':
-            return ''.join([func(i) for i in obj])
-    else:
-        raise BlockError(f"colApplyF only accepts one of {', '.join([i for i in BUILTIN_COLLECTIONS])}.")
+    kind = _kind(obj)
+    if kind >= 0: return _APPLY_BY_KIND[kind](obj, func)
+    raise BlockError(f"colApplyF only accepts one of {_COLLECTION_ERR}.")
 
 @builtin
 def colContains(obj, item):
-    if typeOf(obj) in BUILTIN_COLLECTIONS: return item in obj
-    else: raise BlockError(f"colContains: obj type should be one of {', '.join([i for i in BUILTIN_COLLECTIONS])}.")
+    if _kind(obj) >= 0: return item in obj
+    else: raise BlockError(f"colContains: obj type should be one of {_COLLECTION_ERR}.")
 
 @builtin
 def colJoin(obj, joiner=''): return joiner.join(obj)
 
 @builtin
 def colIndexOf(obj, item, start=0, stop=None):
-    valid_types = [i for i in BUILTIN_COLLECTIONS if i not in ('map', 'set')]
-    if typeOf(obj) in valid_types:
+    if _kind(obj) in _INDEXABLE:
         try:
             if stop is None: return obj.index(item, start)
             else: return obj.index(item, start, stop)
         except ValueError: raise BlockError("colIndexOf: item not found.")
     else:
-        raise BlockError(f"colIndexOf only accepts one of {', '.join(valid_types)}.")
+        raise BlockError(f"colIndexOf only accepts one of {_INDEXABLE_ERR}.")
 
 # Basic utilities
 @builtin
@@ -385,6 +458,8 @@ def fClose(f): return f.close()
 
 # Asynchoronous
 import asyncio
+_iscoroutine, _iscoroutinefunction = asyncio.iscoroutine, asyncio.iscoroutinefunction
+
 @builtin
 def aSleep(seconds):
     async def _s(s):
@@ -395,7 +470,7 @@ def aSleep(seconds):
 @builtin
 def aRun(coro):
     if not callable(coro):
-        try: loop = asyncio.get_event_loop()
+        try: loop = asyncio.get_running_loop()
         except RuntimeError: loop = None
         if loop and loop.is_running():
             task = loop.create_task(coro)
@@ -420,4 +495,11 @@ def aCreateTask(coro):
         return task
 
 @builtin
-def aIsCoroutine(obj): return boolean(asyncio.iscoroutine(obj) or asyncio.iscoroutinefunction(obj))
+def aIsCoroutine(obj): return TRUE if _iscoroutine(obj) or _iscoroutinefunction(obj) else FALSE
+
+BUILTIN_FUNCTIONS = frozenset(BUILTIN_FUNCTIONS_ORDERED)
+__all__ = [
+    'BlockError', 'boolean', 'none', 'NONE', 'TRUE', 'FALSE', 'NumList', 'builtin',
+    'BUILTIN_TYPES', 'BUILTIN_COLLECTIONS', 'BUILTIN_CONSTANTS',
+    'BUILTIN_FUNCTIONS', 'BUILTIN_FUNCTIONS_ORDERED',
+] + [name for name in BUILTIN_FUNCTIONS_ORDERED if name in globals()]
@@ -1,15 +1,15 @@
+import hashlib
+import os
 import re
 import sys
-from typing import List, Union
-
-
-class BlockError(Exception):
-    """Custom exception for Block language transpilation errors"""
-    pass
+from functools import lru_cache
+from typing import List, Union, Dict, Optional, TextIO
+from block_builtins import BlockError
 
 
 class ASTNode:
     """Base class for all AST nodes"""
+    __slots__ = ('value', 'py_value')
     def __init__(self, value):
         self.value = value
         self.py_value = value
@@ -20,6 +20,7 @@ class ASTNode:
 
 class STRING(ASTNode):
     """String literal node"""
+    __slots__ = ()
     def __init__(self, value):
         self.value = value
         self.py_value = f'"{value}"'
@@ -27,13 +28,15 @@ class STRING(ASTNode):
 
 class NUMBER(ASTNode):
     """Numeric literal node"""
+    __slots__ = ()
     def __init__(self, value):
         self.value = value
-        self.py_value = value
+        self.py_value = str(value)
 
 
 class OPERAND(ASTNode):
     """Operand node (variable name, literal, or expression)"""
+    __slots__ = ()
     def __init__(self, value):
         self.value = value
         self.py_value = str(value)
@@ -42,60 +45,57 @@ class OPERAND(ASTNode):
         pass
 
 
+_OP_MAP = {
+    '^': '**',
+    '!': 'not ',
+    '&': ' and ',
+    '|': ' or ',
+    '+': '+',
+    '-': '-',
+    '*': '*',
+    '/': '/',
+    '//': '//',
+    '%': '%',
+    '=': '=',
+    '==': '==',
+    '!=': '!=',
+    '>=': '>=',
+    '<=': '<=',
+    '>': '>',
+    '<': '<',
+    '(': '(',
+    ')': ')',
+}
+_KEYWORDS = frozenset(('for', 'while', 'if', 'elif', 'else', 'in', 'fn', '->'))
+_KW_MAP = {'->': 'return', 'fn': 'def'}
+
+
 class OPERATOR(ASTNode):
     """Operator node with Block to Python mapping"""
+    __slots__ = ()
     
-    operator_map = {
-        '^': '**',
-        '!': 'not ',
-        '&': ' and ',
-        '|': ' or ',
-        '+': '+',
-        '-': '-',
-        '*': '*',
-        '/': '/',
-        '//': '//',
-        '%': '%',
-        '=': '=',
-        '==': '==',
-        '!=': '!=',
-        '>=': '>=',
-        '<=': '<=',
-        '>': '>',
-        '<': '<',
-        '(': '(',
-        ')': ')',
-    }
-    
-    special_operators = ['..']
+    operator_map = _OP_MAP
+    special_operators = ('..',)
     
     def __init__(self, value):
         self.value = value
-        if value in self.operator_map:
-            self.py_value = self.operator_map[value]
-        elif value == '..':
-            self.py_value = '..'
-        else:
-            self.py_value = value
+        self.py_value = _OP_MAP.get(value, value)
 
 
 class KEYWORD(ASTNode):
     """Keyword node"""
+    __slots__ = ()
     
-    keywords = ['for', 'while', 'if', 'elif', 'else', 'in', 'fn', '->']
+    keywords = _KEYWORDS
     
     def __init__(self, value):
         self.value = value
-        if value == '->':
-            self.py_value = 'return'
-        elif value == 'fn':
-            self.py_value = 'def'
-        else:
-            self.py_value = value
+        self.py_value = _KW_MAP.get(value, value)
 
 
 class SPACE(ASTNode):
     """Indentation node"""
+    __slots__ = ()
     def __init__(self, value):
         self.value = value
         self.py_value = value
@@ -107,11 +107,16 @@ class SPACE(ASTNode):
 
 class EOL(ASTNode):
     """End of line marker"""
+    __slots__ = ()
     def __init__(self):
         self.value = '\n'
         self.py_value = '\n'
 
 
+_SOURCE_RE = re.compile(r'(?<!\\)"([^"]*(?:(?<=\\)"[^"]*)*)("?)|\n')
+_COMMENT_PREFIXES = ('>>', '#', '//', '/*', '*/')
+
+
 def sourceToLine(source: str) -> List[str]:
     """
     Convert Block source code into a list of lines.
@@ -120,344 +125,369 @@ def sourceToLine(source: str) -> List[str]:
     - Preserves all other text line-by-line
     """
     lines = []
-    i = 0
-    in_block_comment = False
-    current_line = ""
-    in_string = False
-    string_start = -1
+    parts = []
+    pos = 0
+    search = _SOURCE_RE.search
     
-    while i < len(source):
-        char = source[i]
+    while True:
+        m = search(source, pos)
+        if m is None:
+            parts.append(source[pos:])
+            break
+        parts.append(source[pos:m.start()])
+        pos = m.end()
         
-        if in_block_comment:
-            if i + 1 < len(source) and source[i:i+2] == '*/':
-                in_block_comment = False
-                i += 2
-                continue
-            i += 1
-            continue
-        
-        if char == '"' and (i == 0 or source[i-1] != '\\'):
-            if not in_string:
-                in_string = True
-                string_start = i
-            else:
-                string_content = source[string_start+1:i]
-                string_content = string_content.replace('\n', '\\n').replace('\r', '\\r')
-                current_line += '"' + string_content + '"'
-                in_string = False
-                string_start = -1
-            i += 1
-            continue
-        
-        if in_string:
-            i += 1
+        string_content = m.group(1)
+        if string_content is not None:
+            if not m.group(2):
+                break
+            string_content = string_content.replace('\n', '\\n').replace('\r', '\\r')
+            parts.append('"' + string_content + '"')
             continue
         
-        if char == '\n':
-            line = current_line.strip()
-            
+        current_line = ''.join(parts)
+        parts.clear()
+        line = current_line.strip()
+        if not line.startswith(_COMMENT_PREFIXES):
             if line:
-                is_comment = False
-                for comment_start in ['>>', '#', '//', '/*', '*/']:
-                    if line.startswith(comment_start):
-                        is_comment = True
-                        break
-                
-                if line.startswith('/*'):
-                    in_block_comment = True
-                    is_comment = True
-                
-                if not is_comment:
-                    lines.append(current_line.rstrip())
-            
-            current_line = ""
-            i += 1
-            continue
-        
-        current_line += char
-        i += 1
+                lines.append(current_line.rstrip())
+        elif line.startswith('/*'):
+            end = source.find('*/', pos)
+            if end < 0:
+                return lines
+            pos = end + 2
     
-    if current_line.strip():
-        line = current_line.strip()
-        is_comment = False
-        for comment_start in ['>>', '#', '//', '/*', '*/']:
-            if line.startswith(comment_start):
-                is_comment = True
-                break
-        
-        if not is_comment:
-            lines.append(current_line.rstrip())
+    current_line = ''.join(parts)
+    line = current_line.strip()
+    if line and not line.startswith(_COMMENT_PREFIXES):
+        lines.append(current_line.rstrip())
     
     return lines
 
 
-def linesToAst(lines: List[str]) -> List[ASTNode]:
+class Program(list):
+    """AST node list, plus the collection variables found while tokenizing"""
+    def __init__(self, nodes=()):
+        super().__init__(nodes)
+        self.collection_variables = set()
+
+
+def collect_collection_variables(nodes: List[ASTNode], found: set) -> set:
+    """Add names assigned a list, tuple or set literal within nodes to found"""
+    for idx, node in enumerate(nodes):
+        if isinstance(node, OPERAND) and node.value not in ['[', ']', ',', ':', '=']:
+            if idx + 1 < len(nodes) and isinstance(nodes[idx + 1], OPERATOR) and nodes[idx + 1].value == '=':
+                if idx + 2 < len(nodes):
+                    next_token = nodes[idx + 2]
+                    if isinstance(next_token, OPERAND) and next_token.value == '[':
+                        j = idx + 3
+                        has_colon = False
+                        while j < len(nodes):
+                            if isinstance(nodes[j], EOL):
+                                break
+                            if isinstance(nodes[j], OPERAND) and nodes[j].value == ']':
+                                break
+                            if isinstance(nodes[j], OPERAND) and nodes[j].value == ':':
+                                has_colon = True
+                            j += 1
+                        if not has_colon:
+                            found.add(node.value)
+                    elif isinstance(next_token, OPERATOR) and next_token.value == '(':
+                        found.add(node.value)
+                    elif isinstance(next_token, OPERATOR) and next_token.value == '{':
+                        found.add(node.value)
+    return found
+
+
+# AST nodes are never mutated, so repeated tokens share one instance.
+_EOL_NODE = EOL()
+_SPACE_NODES = {}
+
+
+def linesToAst(lines: List[str]) -> Program:
     """
     Convert lines of Block code into AST nodes.
     Each line is tokenized and converted to appropriate AST nodes.
     """
-    ast_nodes = []
+    ast_nodes = Program()
+    append = ast_nodes.append
+    extend = ast_nodes.extend
     
     for line in lines:
         if not line:
-            ast_nodes.append(EOL())
+            append(_EOL_NODE)
             continue
         
-        indent = len(line) - len(line.lstrip())
+        content = line.lstrip()
+        indent = len(line) - len(content)
         if indent > 0:
-            ast_nodes.append(SPACE(' ' * indent))
+            space = _SPACE_NODES.get(indent)
+            if space is None:
+                space = _SPACE_NODES[indent] = SPACE(' ' * indent)
+            append(space)
         
-        content = line.lstrip()
         tokens = tokenize_line(content)
+        collect_collection_variables(tokens, ast_nodes.collection_variables)
         
-        for token in tokens:
-            ast_nodes.append(token)
-        
-        ast_nodes.append(EOL())
+        extend(tokens)
+        append(_EOL_NODE)
     
     return ast_nodes
 
 
+_TOKEN_RE = re.compile(
+    r'"((?:[^"]|(?<=\\)")*)"?'
+    r'|(-?\d+(?:\.(?!\.)\d*)?)'
+    r'|(\.\.|==|!=|>=|<=|//|->|[-+*/^%=!&|()<>{}])'
+    r'|([\[\],:])'
+    r'|([^\W\d]\w*)'
+)
+_T_STRING, _T_NUMBER, _T_OPERATOR, _T_PUNCT, _T_WORD = range(1, 6)
+_PUNCT_NODES = {c: OPERAND(c) for c in '[],:'}
+_OPERATOR_NODES = {
+    op: KEYWORD(op) if op == '->' else OPERATOR(op)
+    for op in ('..', '==', '!=', '>=', '<=', '//', '->', *'+-*/^%=!&|()<>{}')
+}
+_KEYWORD_NODES = {kw: KEYWORD(kw) for kw in _KEYWORDS}
+_NUMBER_NODES = {str(n): NUMBER(n) for n in range(-128, 1025)}
+
+
 def tokenize_line(content: str) -> List[ASTNode]:
     """Tokenize a single line of Block code into AST nodes"""
     tokens = []
-    i = 0
+    append = tokens.append
     
-    while i < len(content):
-        if content[i].isspace():
-            i += 1
-            continue
-        
-        if content[i] == '"':
-            end = i + 1
-            while end < len(content):
-                if content[end] == '"' and content[end-1] != '\\':
-                    break
-                end += 1
-            string_content = content[i+1:end]
-            tokens.append(STRING(string_content))
-            i = end + 1
-            continue
+    for m in _TOKEN_RE.finditer(content):
+        kind = m.lastindex
+        tok = m.group(kind)
         
-        if content[i].isdigit() or (content[i] == '-' and i+1 < len(content) and content[i+1].isdigit()):
-            end = i + 1
-            has_dot = False
-            while end < len(content) and (content[end].isdigit() or (content[end] == '.' and not has_dot)):
-                if content[end] == '.':
-                    if end + 1 < len(content) and content[end+1] == '.':
-                        break
-                    has_dot = True
-                end += 1
-            num_str = content[i:end]
-            if '.' in num_str:
-                tokens.append(NUMBER(float(num_str)))
+        if kind == _T_WORD:
+            node = _KEYWORD_NODES.get(tok)
+            append(node if node is not None else OPERAND(sys.intern(tok)))
+        elif kind == _T_PUNCT:
+            append(_PUNCT_NODES[tok])
+        elif kind == _T_OPERATOR:
+            append(_OPERATOR_NODES[tok])
+        elif kind == _T_STRING:
+            append(STRING(tok))
+        else:
+            node = _NUMBER_NODES.get(tok)
+            append(node if node is not None else NUMBER(float(tok) if '.' in tok else int(tok)))
+    
+    return tokens
+
+
+_BRACKET_RE = re.compile(r'[()\[\]{}]')
+
+
+class _BracketTracker:
+    """Tracks the unmatched openers of the line being emitted, one fragment at a time"""
+    
+    closers = {'(': ')', '[': ']', '{': '}'}
+    openers = {')': '(', ']': '[', '}': '{'}
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.stacks = {'(': [], '[': [], '{': []}
+        self.scanned = 0
+        self.offset = 0
+    
+    def closer(self, line_parts: List[str]) -> str:
+        """Closer for the nearest unmatched opener, ']' when nothing is open"""
+        text = ''.join(line_parts[self.scanned:])
+        for m in _BRACKET_RE.finditer(text):
+            c = m.group()
+            if c in self.closers:
+                self.stacks[c].append(self.offset + m.start())
             else:
-                tokens.append(NUMBER(int(num_str)))
-            i = end
-            continue
+                stack = self.stacks[self.openers[c]]
+                if stack:
+                    stack.pop()
+        self.scanned = len(line_parts)
+        self.offset += len(text)
         
-        if i + 1 < len(content) and content[i:i+2] in ['..', '==', '!=', '>=', '<=', '//', '->']:
-            op = content[i:i+2]
-            if op == '->':
-                tokens.append(KEYWORD('->'))
-            else:
-                tokens.append(OPERATOR(op))
-            i += 2
-            continue
+        nearest, pos = None, -1
+        for opener, stack in self.stacks.items():
+            if stack and stack[-1] > pos:
+                nearest, pos = opener, stack[-1]
+        return self.closers[nearest] if nearest else ']'
+
+
+def _match_brackets(ast_nodes: List[ASTNode]) -> Dict[int, int]:
+    """Map each '[' index to its matching ']', or to the line's EOL when left open"""
+    table = {}
+    stack = []
+    for idx, node in enumerate(ast_nodes):
+        node_type = type(node)
+        if node_type is OPERAND:
+            if node.value == '[':
+                stack.append(idx)
+            elif node.value == ']' and stack:
+                table[stack.pop()] = idx
+        elif node_type is EOL:
+            for open_idx in stack:
+                table[open_idx] = idx
+            stack.clear()
+    for open_idx in stack:
+        table[open_idx] = len(ast_nodes)
+    return table
+
+
+def _line_writer(out):
+    """Write each line to out, newline-separated like '\\n'.join"""
+    sep = ''
+    def write(line):
+        nonlocal sep
+        out.write(sep)
+        out.write(line)
+        sep = '\n'
+    return write
+
+
+def _for_iterable(iterable_tokens: List[ASTNode]) -> str:
+    """Python iterable for a for-loop: 'a..b' becomes an inclusive range()"""
+    # Split on the first '..' in one pass; range_end_tokens stays None without one
+    range_start_tokens = []
+    range_end_tokens = None
+    for token in iterable_tokens:
+        if isinstance(token, OPERATOR) and token.value == '..':
+            if range_end_tokens is None:
+                range_end_tokens = []
+        elif range_end_tokens is None:
+            range_start_tokens.append(token)
+        else:
+            range_end_tokens.append(token)
+    
+    if range_end_tokens is not None:
+        start_expr = ''.join(t.py_value for t in range_start_tokens)
+        end_expr = ''.join(t.py_value for t in range_end_tokens)
+        if start_expr and end_expr:
+            return f'range({start_expr}, {end_expr} + 1)'
+    return ''.join(t.py_value for t in iterable_tokens)
+
+
+def _emit_for(ast_nodes: List[ASTNode], i: int, add_part) -> int:
+    """Emit the 'for' header whose keyword is at i; returns the index of its EOL"""
+    n_nodes = len(ast_nodes)
+    add_part('for ')
+    i += 1
+    
+    while i < n_nodes:
+        if isinstance(ast_nodes[i], EOL):
+            break
         
-        if content[i] in '+-*/^%=!&|()<>{}':
-            tokens.append(OPERATOR(content[i]))
+        if isinstance(ast_nodes[i], KEYWORD) and ast_nodes[i].value == 'in':
+            add_part(' in ')
             i += 1
+            
+            iterable_tokens = []
+            while i < n_nodes:
+                if isinstance(ast_nodes[i], EOL):
+                    break
+                if isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ':':
+                    break
+                iterable_tokens.append(ast_nodes[i])
+                i += 1
+            
+            add_part(_for_iterable(iterable_tokens))
             continue
         
-        if content[i] == '[' or content[i] == ']' or content[i] == ',' or content[i] == ':':
-            tokens.append(OPERAND(content[i]))
-            i += 1
-            continue
+        add_part(ast_nodes[i].py_value)
+        i += 1
+    
+    return i
+
+
+def _emit_fn(ast_nodes: List[ASTNode], i: int, add_part) -> int:
+    """Emit the 'def' header whose 'fn' keyword is at i; returns the index after it"""
+    n_nodes = len(ast_nodes)
+    add_part('def ')
+    i += 1
+    
+    if i < n_nodes and isinstance(ast_nodes[i], OPERAND):
+        add_part(ast_nodes[i].py_value)
+        i += 1
+    
+    if i < n_nodes and isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == '[':
+        add_part('(')
+        i += 1
         
-        if content[i].isalpha() or content[i] == '_':
-            end = i + 1
-            while end < len(content) and (content[end].isalnum() or content[end] == '_'):
-                end += 1
-            word = content[i:end]
-            
-            if word in KEYWORD.keywords:
-                tokens.append(KEYWORD(word))
+        while i < n_nodes and not (isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ']'):
+            if isinstance(ast_nodes[i], EOL):
+                break
+            if isinstance(ast_nodes[i], OPERATOR) and ast_nodes[i].value == '=':
+                add_part('=')
             else:
-                tokens.append(OPERAND(word))
-            i = end
-            continue
+                add_part(ast_nodes[i].py_value)
+            i += 1
         
-        i += 1
+        if i < n_nodes and isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ']':
+            add_part(')')
+            i += 1
     
-    return tokens
+    return i
 
 
-def astToPy(ast_nodes: List[ASTNode]) -> str:
+def astToPy(ast_nodes: List[ASTNode], out: Optional[TextIO] = None) -> Optional[str]:
     """
     Convert AST nodes to Python source code.
     Uses the .py_value of each node to generate output.
+    When out is given, lines are written to it as they are finished and None is returned.
     """
-    defined_functions = set()
-    collection_variables = set()
-    
-    for idx, node in enumerate(ast_nodes):
-        if isinstance(node, KEYWORD) and node.value == 'fn':
-            if idx + 1 < len(ast_nodes) and isinstance(ast_nodes[idx + 1], OPERAND):
-                defined_functions.add(ast_nodes[idx + 1].value)
-        
-        if isinstance(node, OPERAND) and node.value not in ['[', ']', ',', ':', '=']:
-            if idx + 1 < len(ast_nodes) and isinstance(ast_nodes[idx + 1], OPERATOR) and ast_nodes[idx + 1].value == '=':
-                if idx + 2 < len(ast_nodes):
-                    next_token = ast_nodes[idx + 2]
-                    if isinstance(next_token, OPERAND) and next_token.value == '[':
-                        j = idx + 3
-                        has_colon = False
-                        while j < len(ast_nodes):
-                            if isinstance(ast_nodes[j], EOL):
-                                break
-                            if isinstance(ast_nodes[j], OPERAND) and ast_nodes[j].value == ']':
-                                break
-                            if isinstance(ast_nodes[j], OPERAND) and ast_nodes[j].value == ':':
-                                has_colon = True
-                            j += 1
-                        if not has_colon:
-                            collection_variables.add(node.value)
-                    elif isinstance(next_token, OPERATOR) and next_token.value == '(':
-                        collection_variables.add(node.value)
-                    elif isinstance(next_token, OPERATOR) and next_token.value == '{':
-                        collection_variables.add(node.value)
+    n_nodes = len(ast_nodes)
+    bracket_table = _match_brackets(ast_nodes)
+    collection_variables = getattr(ast_nodes, 'collection_variables', None)
+    if collection_variables is None:
+        collection_variables = collect_collection_variables(ast_nodes, set())
     
     python_code = []
-    current_line = ""
+    emit = python_code.append if out is None else _line_writer(out)
+    line_parts = []
+    add_part = line_parts.append
+    brackets = _BracketTracker()
     i = 0
     
-    while i < len(ast_nodes):
+    while i < n_nodes:
         node = ast_nodes[i]
+        node_type = type(node)
         
-        if isinstance(node, EOL):
-            python_code.append(current_line)
-            current_line = ""
+        if node_type is EOL:
+            emit(''.join(line_parts))
+            line_parts.clear()
+            brackets.reset()
             i += 1
             continue
         
-        if isinstance(node, SPACE):
-            current_line += node.py_value
+        if node_type is SPACE:
+            add_part(node.py_value)
             i += 1
             continue
         
-        if isinstance(node, KEYWORD):
+        if node_type is KEYWORD:
             if node.value == 'fn':
-                current_line += 'def '
-                i += 1
-                
-                if i < len(ast_nodes) and isinstance(ast_nodes[i], OPERAND):
-                    current_line += ast_nodes[i].py_value
-                    i += 1
-                
-                if i < len(ast_nodes) and isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == '[':
-                    current_line += '('
-                    i += 1
-                    
-                    while i < len(ast_nodes) and not (isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ']'):
-                        if isinstance(ast_nodes[i], EOL):
-                            break
-                        if isinstance(ast_nodes[i], OPERATOR) and ast_nodes[i].value == '=':
-                            current_line += '='
-                        else:
-                            current_line += ast_nodes[i].py_value
-                        i += 1
-                    
-                    if i < len(ast_nodes) and isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ']':
-                        current_line += ')'
-                        i += 1
-                
+                i = _emit_fn(ast_nodes, i, add_part)
                 continue
             
             elif node.value == '->':
-                current_line += 'return '
+                add_part('return ')
                 i += 1
                 continue
             
             elif node.value == 'for':
-                current_line += 'for '
-                i += 1
-                
-                while i < len(ast_nodes):
-                    if isinstance(ast_nodes[i], EOL):
-                        break
-                    
-                    if isinstance(ast_nodes[i], KEYWORD) and ast_nodes[i].value == 'in':
-                        current_line += ' in '
-                        i += 1
-                        
-                        iterable_tokens = []
-                        while i < len(ast_nodes):
-                            if isinstance(ast_nodes[i], EOL):
-                                break
-                            if isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ':':
-                                break
-                            iterable_tokens.append(ast_nodes[i])
-                            i += 1
-                        
-                        has_range_operator = any(isinstance(t, OPERATOR) and t.value == '..' for t in iterable_tokens)
-                        
-                        if has_range_operator:
-                            range_start_tokens = []
-                            range_end_tokens = []
-                            found_range_op = False
-                            
-                            for token in iterable_tokens:
-                                if isinstance(token, OPERATOR) and token.value == '..':
-                                    found_range_op = True
-                                elif not found_range_op:
-                                    range_start_tokens.append(token)
-                                else:
-                                    range_end_tokens.append(token)
-                            
-                            start_expr = ''.join(t.py_value if hasattr(t, 'py_value') else str(t) for t in range_start_tokens)
-                            end_expr = ''.join(t.py_value if hasattr(t, 'py_value') else str(t) for t in range_end_tokens)
-                            
-                            if start_expr and end_expr:
-                                current_line += f'range({start_expr}, {end_expr} + 1)'
-                            else:
-                                current_line += ''.join(t.py_value if hasattr(t, 'py_value') else str(t) for t in iterable_tokens)
-                        else:
-                            current_line += ''.join(t.py_value if hasattr(t, 'py_value') else str(t) for t in iterable_tokens)
-                        
-                        continue
-                    
-                    current_line += ast_nodes[i].py_value
-                    i += 1
-                
+                i = _emit_for(ast_nodes, i, add_part)
                 continue
             
             else:
-                current_line += node.py_value + ' '
+                add_part(node.py_value + ' ')
                 i += 1
                 continue
         
-        if isinstance(node, OPERAND):
+        if node_type is OPERAND:
             if node.value == ':':
-                current_line += ':'
+                add_part(':')
             elif node.value == '[':
-                bracket_content = []
-                j = i + 1
-                bracket_depth = 1
-                while j < len(ast_nodes) and bracket_depth > 0:
-                    if isinstance(ast_nodes[j], EOL):
-                        break
-                    if isinstance(ast_nodes[j], OPERAND):
-                        if ast_nodes[j].value == '[':
-                            bracket_depth += 1
-                        elif ast_nodes[j].value == ']':
-                            bracket_depth -= 1
-                            if bracket_depth == 0:
-                                break
-                    bracket_content.append(ast_nodes[j])
-                    j += 1
-                
                 prev_var_name = None
                 is_after_var = i > 0 and isinstance(ast_nodes[i-1], OPERAND) and ast_nodes[i-1].value not in ['[', ']', ',', ':', '=']
                 if is_after_var:
@@ -465,27 +495,25 @@ def astToPy(ast_nodes: List[ASTNode]) -> str:
                 
                 is_collection = prev_var_name in collection_variables if prev_var_name else False
                 
-                has_colon_pair = False
-                has_comma = False
-                is_empty = len(bracket_content) == 0
-                colon_count = 0
-                comma_count = 0
+                if is_after_var and not is_collection:
+                    # Call f[args] -> f(args); the contents need no classifying
+                    add_part('(')
+                    i += 1
+                    continue
                 
-                for tok in bracket_content:
-                    if isinstance(tok, OPERAND):
-                        if tok.value == ':':
-                            colon_count += 1
-                        elif tok.value == ',':
-                            comma_count += 1
+                j = bracket_table[i]
+                bracket_content = ast_nodes[i + 1:j]
                 
-                if colon_count > 0 and comma_count >= colon_count - 1:
-                    has_colon_pair = True
-                if comma_count > 0:
-                    has_comma = True
+                is_empty = len(bracket_content) == 0
+                operand_values = [tok.value for tok in bracket_content if type(tok) is OPERAND]
+                colon_count = operand_values.count(':')
+                comma_count = operand_values.count(',')
+                has_colon_pair = colon_count > 0 and comma_count >= colon_count - 1
+                has_comma = comma_count > 0
                 
-                if is_after_var and is_collection:
+                if is_after_var:
                     if is_empty:
-                        current_line += '[:]'
+                        add_part('[:]')
                         i = j + 1
                         continue
                     elif has_comma and not has_colon_pair:
@@ -503,66 +531,36 @@ def astToPy(ast_nodes: List[ASTNode]) -> str:
                         if len(slice_parts) == 2:
                             start_expr = ''.join(t.py_value for t in slice_parts[0])
                             end_expr = ''.join(t.py_value for t in slice_parts[1])
-                            current_line += f'[{start_expr}:{end_expr}+1]'
+                            add_part(f'[{start_expr}:{end_expr}+1]')
                             i = j + 1
                             continue
                         else:
-                            current_line += '['
+                            add_part('[')
                     else:
-                        current_line += '['
-                elif is_after_var:
-                    current_line += '('
+                        add_part('[')
                 else:
                     if has_colon_pair:
-                        current_line += '{'
+                        add_part('{')
                     else:
-                        current_line += '['
+                        add_part('[')
             elif node.value == ']':
-                paren_count = 0
-                bracket_count = 0
-                brace_count = 0
-                for c in reversed(current_line):
-                    if c == ')':
-                        paren_count += 1
-                    elif c == '(':
-                        paren_count -= 1
-                        if paren_count < 0:
-                            current_line += ')'
-                            break
-                    elif c == ']':
-                        bracket_count += 1
-                    elif c == '[':
-                        bracket_count -= 1
-                        if bracket_count < 0:
-                            current_line += ']'
-                            break
-                    elif c == '}':
-                        brace_count += 1
-                    elif c == '{':
-                        brace_count -= 1
-                        if brace_count < 0:
-                            current_line += '}'
-                            break
-                else:
-                    if paren_count < 0:
-                        current_line += ')'
-                    elif brace_count < 0:
-                        current_line += '}'
-                    else:
-                        current_line += ']'
+                add_part(brackets.closer(line_parts))
             else:
-                current_line += node.py_value
+                add_part(node.py_value)
         else:
-            current_line += node.py_value
+            add_part(node.py_value)
         
         i += 1
     
+    current_line = ''.join(line_parts)
     if current_line:
-        python_code.append(current_line)
+        emit(current_line)
     
-    return '\n'.join(python_code)
+    if out is None:
+        return '\n'.join(python_code)
 
 
+@lru_cache(maxsize=128)
 def transpile(source: str) -> str:
     """
     Main transpiler function.
@@ -571,44 +569,109 @@ def transpile(source: str) -> str:
     try:
         lines = sourceToLine(source)
         ast_nodes = linesToAst(lines)
-        print(ast_nodes)
         python_code = astToPy(ast_nodes)
         return python_code
     except Exception as e:
         raise BlockError(f"Transpilation error: {str(e)}")
 
 
+def transpile_to(source: str, out: TextIO) -> None:
+    """
+    Streaming variant of transpile().
+    Converts Block source code to Python, writing each line to out as it is produced.
+    """
+    try:
+        lines = sourceToLine(source)
+        ast_nodes = linesToAst(lines)
+        astToPy(ast_nodes, out)
+    except Exception as e:
+        raise BlockError(f"Transpilation error: {str(e)}")
+
+
+_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'block_transpiler')
+
+
+def _file_digest(*paths: str) -> bytes:
+    """BLAKE2b digest over the contents of the given files."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+_CACHE_SALT = _file_digest(__file__)
+
+
+def transpile_cached(source: str) -> str:
+    """
+    On-disk memoized variant of transpile().
+    Output is stored under _CACHE_DIR, keyed by a hash of the source and of this transpiler.
+    """
+    key = hashlib.blake2b(_CACHE_SALT, digest_size=16)
+    key.update(source.encode())
+    cache_file = os.path.join(_CACHE_DIR, key.hexdigest() + '.py')
+    
+    try:
+        with open(cache_file, 'r') as f:
+            return f.read()
+    except OSError:
+        pass
+    
+    python_code = transpile(source)
+    tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        with open(tmp_file, 'w') as f:
+            f.write(python_code)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return python_code
+
+
 def main():
     """CLI interface for the Block transpiler"""
-    if len(sys.argv) < 2:
-        print("Usage: python block_transpiler.py <input.block> [output.py]")
-        print("   or: python block_transpiler.py -c '<block code>'")
+    use_cache = '--cache' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--cache']
+    
+    if len(args) < 1:
+        print("Usage: python block_transpiler.py [--cache] <input.block> [output.py]")
+        print("   or: python block_transpiler.py [--cache] -c '<block code>'")
         sys.exit(1)
     
-    if sys.argv[1] == '-c':
-        if len(sys.argv) < 3:
+    if args[0] == '-c':
+        if len(args) < 2:
             print("Error: -c requires code argument")
             sys.exit(1)
         
-        source = sys.argv[2]
+        source = args[1]
         try:
-            python_code = transpile(source)
+            python_code = transpile_cached(source) if use_cache else transpile(source)
             print(python_code)
         except BlockError as e:
             print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
     else:
-        input_file = sys.argv[1]
-        output_file = sys.argv[2] if len(sys.argv) > 2 else input_file.replace('.block', '.py')
+        input_file = args[0]
+        output_file = args[1] if len(args) > 1 else input_file.replace('.block', '.py')
         
         try:
             with open(input_file, 'r') as f:
                 source = f.read()
             
-            python_code = transpile(source)
-            
-            with open(output_file, 'w') as f:
-                f.write(python_code)
+            tmp_file = output_file + '.tmp'
+            try:
+                with open(tmp_file, 'w') as f:
+                    if use_cache:
+                        f.write(transpile_cached(source))
+                    else:
+                        transpile_to(source, f)
+                os.replace(tmp_file, output_file)
+            finally:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
             
             print(f"Successfully transpiled {input_file} -> {output_file}")
         except FileNotFoundError:
@@ -1,10 +1,15 @@
+import hashlib
+import os
 import re
 import sys
-from typing import List, Union, Dict, Set, Optional
+import block_builtins
+from functools import lru_cache
+from typing import List, Union, Dict, Set, Optional, TextIO
 from block_builtins import BlockError, BUILTIN_TYPES, BUILTIN_FUNCTIONS, BUILTIN_CONSTANTS
 
 class ASTNode:
     """Base class for all AST nodes"""
+    __slots__ = ('value', 'py_value')
     def __init__(self, value):
         self.value = value
         self.py_value = value
@@ -15,6 +20,7 @@ class ASTNode:
 
 class STRING(ASTNode):
     """String literal node"""
+    __slots__ = ()
     def __init__(self, value):
         self.value = value
         self.py_value = f'"{value}"'
@@ -22,6 +28,7 @@ class STRING(ASTNode):
 
 class NUMBER(ASTNode):
     """Numeric literal node"""
+    __slots__ = ()
     def __init__(self, value):
         self.value = value
         self.py_value = str(value)
@@ -29,65 +36,63 @@ class NUMBER(ASTNode):
 
 class OPERAND(ASTNode):
     """Operand node (variable name, literal, or expression)"""
+    __slots__ = ()
     def __init__(self, value):
         self.value = value
         self.py_value = str(value)
 
 
+_OP_MAP = {
+    '^': '**',
+    '!': 'not ',
+    '&': ' and ',
+    '|': ' or ',
+    '+': '+',
+    '-': '-',
+    '*': '*',
+    '/': '/',
+    '//': '//',
+    '%': '%',
+    '=': '=',
+    '==': '==',
+    '!=': '!=',
+    '>=': '>=',
+    '<=': '<=',
+    '>': '>',
+    '<': '<',
+    '(': '(',
+    ')': ')',
+}
+_KEYWORDS = frozenset(('for', 'while', 'if', 'elif', 'else', 'in', 'fn', '->'))
+_KW_MAP = {'->': 'return', 'fn': 'def'}
+
+
 class OPERATOR(ASTNode):
     """Operator node with Block to Python mapping"""
+    __slots__ = ()
     
-    operator_map = {
-        '^': '**',
-        '!': 'not ',
-        '&': ' and ',
-        '|': ' or ',
-        '+': '+',
-        '-': '-',
-        '*': '*',
-        '/': '/',
-        '//': '//',
-        '%': '%',
-        '=': '=',
-        '==': '==',
-        '!=': '!=',
-        '>=': '>=',
-        '<=': '<=',
-        '>': '>',
-        '<': '<',
-        '(': '(',
-        ')': ')',
-    }
-    
-    special_operators = ['..']
+    operator_map = _OP_MAP
+    special_operators = ('..',)
     
     def __init__(self, value):
         self.value = value
-        if value in self.operator_map:
-            self.py_value = self.operator_map[value]
-        elif value == '..':
-            self.py_value = '..'
-        else:
-            self.py_value = value
+        self.py_value = _OP_MAP.get(value, value)
 
 
 class KEYWORD(ASTNode):
     """Keyword node"""
+    __slots__ = ()
     
-    keywords = ['for', 'while', 'if', 'elif', 'else', 'in', 'fn', '->']
+    keywords = _KEYWORDS
     
     def __init__(self, value):
         self.value = value
-        if value == '->':
-            self.py_value = 'return'
-        elif value == 'fn':
-            self.py_value = 'def'
-        else:
-            self.py_value = value
+        self.py_value = _KW_MAP.get(value, value)
 
 
 class SPACE(ASTNode):
     """Indentation node"""
+    __slots__ = ()
     def __init__(self, value):
         self.value = value
         self.py_value = value
@@ -99,6 +104,7 @@ class SPACE(ASTNode):
 
 class TYPE(ASTNode):
     """Type annotation node (stripped in transpilation)"""
+    __slots__ = ()
     def __init__(self, value):
         self.value = value
         self.py_value = ''  # Type annotations don't appear in Python output
@@ -106,25 +112,31 @@ class TYPE(ASTNode):
 
 class EOL(ASTNode):
     """End of line marker"""
+    __slots__ = ()
     def __init__(self):
         self.value = '\n'
         self.py_value = '\n'
 
 
+_COLLECTION_CLOSERS = {'[': ']', '(': ')', '{': '}'}
+_BLOCK_OPENERS = ('if ', 'elif ', 'while ', 'else', 'def ')
+# Python text for builtin identifiers; constants win over same-named functions
+_BUILTIN_IDENTS = {name: name for name in BUILTIN_FUNCTIONS}
+_BUILTIN_IDENTS.update((name, py_value) for name, (_, py_value) in BUILTIN_CONSTANTS.items())
+
+
 class TypeSystem:
     """Track types of variables and functions in Block code"""
     
-    BUILTIN_TYPES = set(BUILTIN_TYPES)
-    BUILTIN_FUNCTIONS = set(BUILTIN_FUNCTIONS)
+    BUILTIN_TYPES = frozenset(BUILTIN_TYPES)
+    BUILTIN_FUNCTIONS = frozenset(BUILTIN_FUNCTIONS)
     BUILTIN_CONSTANTS = BUILTIN_CONSTANTS
     
     def __init__(self):
         self.variables: Dict[str, str] = {}  # var_name -> type
-        self.functions: Dict[str, str] = {}  # func_name -> return_type
+        # func_name -> return_type, builtins default to 'num'
+        self.functions: Dict[str, str] = dict.fromkeys(self.BUILTIN_FUNCTIONS, 'num')
         self.function_params: Dict[str, List[tuple]] = {}  # func_name -> [(param_name, param_type), ...]
-        # Initialize builtin functions
-        for fname in self.BUILTIN_FUNCTIONS:
-            self.functions[fname] = 'num'  # default return type
     
     def define_variable(self, name: str, var_type: str) -> None:
         """Define a variable with its type"""
@@ -163,13 +175,12 @@ class TypeSystem:
         # [type], (type), {type}, {key:val}
         if not type_str:
             return False
-        if type_str.startswith('[') and type_str.endswith(']'):
-            return True
-        if type_str.startswith('(') and type_str.endswith(')'):
-            return True
-        if type_str.startswith('{') and type_str.endswith('}'):
-            return True
-        return False
+        closer = _COLLECTION_CLOSERS.get(type_str[0])
+        return closer is not None and type_str[-1] == closer
+
+
+_SOURCE_RE = re.compile(r'(?<!\\)"([^"]*(?:(?<=\\)"[^"]*)*)("?)|\n')
+_COMMENT_PREFIXES = ('>>', '#', '//', '/*', '*/')
 
 
 def sourceToLine(source: str) -> List[str]:
@@ -180,182 +191,124 @@ def sourceToLine(source: str) -> List[str]:
     - Preserves all other text line-by-line
     """
     lines = []
-    i = 0
-    in_block_comment = False
-    current_line = ""
-    in_string = False
-    string_start = -1
-    
-    while i < len(source):
-        char = source[i]
-        
-        if in_block_comment:
-            if i + 1 < len(source) and source[i:i+2] == '*/':
-                in_block_comment = False
-                i += 2
-                continue
-            i += 1
-            continue
-        
-        if char == '"' and (i == 0 or source[i-1] != '\\'):
-            if not in_string:
-                in_string = True
-                string_start = i
-            else:
-                string_content = source[string_start+1:i]
-                string_content = string_content.replace('\n', '\\n').replace('\r', '\\r')
-                current_line += '"' + string_content + '"'
-                in_string = False
-                string_start = -1
-            i += 1
-            continue
-        
-        if in_string:
-            i += 1
-            continue
+    parts = []
+    pos = 0
+    search = _SOURCE_RE.search
+    
+    while True:
+        m = search(source, pos)
+        if m is None:
+            parts.append(source[pos:])
+            break
+        parts.append(source[pos:m.start()])
+        pos = m.end()
         
-        if char == '\n':
-            line = current_line.strip()
-            
-            if line:
-                is_comment = False
-                for comment_start in ['>>', '#', '//', '/*', '*/']:
-                    if line.startswith(comment_start):
-                        is_comment = True
-                        break
-                
-                if line.startswith('/*'):
-                    in_block_comment = True
-                    is_comment = True
-                
-                if not is_comment:
-                    lines.append(current_line.rstrip())
-            
-            current_line = ""
-            i += 1
+        string_content = m.group(1)
+        if string_content is not None:
+            if not m.group(2):
+                break
+            string_content = string_content.replace('\n', '\\n').replace('\r', '\\r')
+            parts.append('"' + string_content + '"')
             continue
         
-        current_line += char
-        i += 1
-    
-    if current_line.strip():
+        current_line = ''.join(parts)
+        parts.clear()
         line = current_line.strip()
-        is_comment = False
-        for comment_start in ['>>', '#', '//', '/*', '*/']:
-            if line.startswith(comment_start):
-                is_comment = True
-                break
-        
-        if not is_comment:
-            lines.append(current_line.rstrip())
+        if not line.startswith(_COMMENT_PREFIXES):
+            if line:
+                lines.append(current_line.rstrip())
+        elif line.startswith('/*'):
+            end = source.find('*/', pos)
+            if end < 0:
+                return lines
+            pos = end + 2
+    
+    current_line = ''.join(parts)
+    line = current_line.strip()
+    if line and not line.startswith(_COMMENT_PREFIXES):
+        lines.append(current_line.rstrip())
     
     return lines
 
 
+# AST nodes are never mutated, so repeated tokens share one instance.
+_EOL_NODE = EOL()
+_SPACE_NODES = {}
+
+
 def linesToAst(lines: List[str]) -> List[ASTNode]:
     """
     Convert lines of Block code into AST nodes.
     Each line is tokenized and converted to appropriate AST nodes.
     """
     ast_nodes = []
+    append = ast_nodes.append
+    extend = ast_nodes.extend
     
     for line in lines:
         if not line:
-            ast_nodes.append(EOL())
+            append(_EOL_NODE)
             continue
         
-        indent = len(line) - len(line.lstrip())
-        if indent > 0:
-            ast_nodes.append(SPACE(' ' * indent))
-        
         content = line.lstrip()
-        tokens = tokenize_line(content)
-        
-        for token in tokens:
-            ast_nodes.append(token)
+        indent = len(line) - len(content)
+        if indent > 0:
+            space = _SPACE_NODES.get(indent)
+            if space is None:
+                space = _SPACE_NODES[indent] = SPACE(' ' * indent)
+            append(space)
         
-        ast_nodes.append(EOL())
+        extend(tokenize_line(content))
+        append(_EOL_NODE)
     
     return ast_nodes
 
 
+_TOKEN_RE = re.compile(
+    r'"((?:[^"]|(?<=\\)")*)"?'
+    r'|(-?\d+(?:\.(?!\.)\d*)?)'
+    r'|(\.\.|==|!=|>=|<=|//|->|[-+*/^%=!&|()<>{}])'
+    r'|([\[\],:])'
+    r'|([^\W\d]\w*)'
+)
+_T_STRING, _T_NUMBER, _T_OPERATOR, _T_PUNCT, _T_WORD = range(1, 6)
+_PUNCT_NODES = {c: OPERAND(c) for c in '[],:'}
+_OPERATOR_NODES = {
+    op: KEYWORD(op) if op == '->' else OPERATOR(op)
+    for op in ('..', '==', '!=', '>=', '<=', '//', '->', *'+-*/^%=!&|()<>{}')
+}
+_KEYWORD_NODES = {kw: KEYWORD(kw) for kw in _KEYWORDS}
+_NUMBER_NODES = {str(n): NUMBER(n) for n in range(-128, 1025)}
+
+
 def tokenize_line(content: str) -> List[ASTNode]:
     """Tokenize a single line of Block code into AST nodes"""
     tokens = []
-    i = 0
+    append = tokens.append
     
-    while i < len(content):
-        if content[i].isspace():
-            i += 1
-            continue
-        
-        if content[i] == '"':
-            end = i + 1
-            while end < len(content):
-                if content[end] == '"' and content[end-1] != '\\':
-                    break
-                end += 1
-            string_content = content[i+1:end]
-            tokens.append(STRING(string_content))
-            i = end + 1
-            continue
+    for m in _TOKEN_RE.finditer(content):
+        kind = m.lastindex
+        tok = m.group(kind)
         
-        if content[i].isdigit() or (content[i] == '-' and i+1 < len(content) and content[i+1].isdigit()):
-            end = i + 1
-            has_dot = False
-            while end < len(content) and (content[end].isdigit() or (content[end] == '.' and not has_dot)):
-                if content[end] == '.':
-                    if end + 1 < len(content) and content[end+1] == '.':
-                        break
-                    has_dot = True
-                end += 1
-            num_str = content[i:end]
-            if '.' in num_str:
-                tokens.append(NUMBER(float(num_str)))
-            else:
-                tokens.append(NUMBER(int(num_str)))
-            i = end
-            continue
-        
-        if i + 1 < len(content) and content[i:i+2] in ['..', '==', '!=', '>=', '<=', '//', '->']:
-            op = content[i:i+2]
-            if op == '->':
-                tokens.append(KEYWORD('->'))
-            else:
-                tokens.append(OPERATOR(op))
-            i += 2
-            continue
-        
-        if content[i] in '+-*/^%=!&|()<>{}':
-            tokens.append(OPERATOR(content[i]))
-            i += 1
-            continue
-        
-        if content[i] == '[' or content[i] == ']' or content[i] == ',' or content[i] == ':':
-            tokens.append(OPERAND(content[i]))
-            i += 1
-            continue
-        
-        if content[i].isalpha() or content[i] == '_':
-            end = i + 1
-            while end < len(content) and (content[end].isalnum() or content[end] == '_'):
-                end += 1
-            word = content[i:end]
-            
-            if word in KEYWORD.keywords:
-                tokens.append(KEYWORD(word))
-            else:
-                tokens.append(OPERAND(word))
-            i = end
-            continue
-        
-        i += 1
+        if kind == _T_WORD:
+            node = _KEYWORD_NODES.get(tok)
+            append(node if node is not None else OPERAND(sys.intern(tok)))
+        elif kind == _T_PUNCT:
+            append(_PUNCT_NODES[tok])
+        elif kind == _T_OPERATOR:
+            append(_OPERATOR_NODES[tok])
+        elif kind == _T_STRING:
+            append(STRING(tok))
+        else:
+            node = _NUMBER_NODES.get(tok)
+            append(node if node is not None else NUMBER(float(tok) if '.' in tok else int(tok)))
     
     return tokens
 
 
-def extract_type_info(ast_nodes: List[ASTNode], start_idx: int) -> tuple:
-    """Extract type name from colon position, returns (type_name, end_idx)"""
+def extract_type_info(ast_nodes: List[ASTNode], start_idx: int, bracket_table: Optional[Dict[int, int]] = None) -> tuple:
+    """Extract type name from colon position, returns (type_name, end_idx)
+    With a _match_brackets table, a closed '[...]' annotation is taken in one slice."""
     if start_idx >= len(ast_nodes) or not (isinstance(ast_nodes[start_idx], OPERAND) and ast_nodes[start_idx].value == ':'):
         return None, start_idx
     
@@ -370,6 +323,11 @@ def extract_type_info(ast_nodes: List[ASTNode], start_idx: int) -> tuple:
             type_tokens.append(node.value)
             idx += 1
         elif isinstance(node, OPERAND) and node.value in ['[', '(', '{']:
+            close_idx = bracket_table.get(idx) if bracket_table is not None else None
+            if close_idx is not None and close_idx < len(ast_nodes) and type(ast_nodes[close_idx]) is OPERAND:
+                type_tokens.extend(n.value for n in ast_nodes[idx:close_idx + 1] if type(n) is OPERAND)
+                idx = close_idx + 1
+                break
             type_tokens.append(node.value)
             bracket = node.value
             close_bracket = {'[': ']', '(': ')', '{': '}'}[bracket]
@@ -422,23 +380,233 @@ def infer_value_type(ast_nodes: List[ASTNode], start_idx: int, type_system: Type
     return 'num'  # default
 
 
-def astToPy(ast_nodes: List[ASTNode]) -> str:
+_BRACKET_RE = re.compile(r'[()\[\]{}]')
+
+
+class _BracketTracker:
+    """Tracks the unmatched openers of the line being emitted, one fragment at a time"""
+    
+    closers = {'(': ')', '[': ']', '{': '}'}
+    openers = {')': '(', ']': '[', '}': '{'}
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.stacks = {'(': [], '[': [], '{': []}
+        self.scanned = 0
+        self.offset = 0
+    
+    def closer(self, line_parts: List[str]) -> str:
+        """Closer for the nearest unmatched opener, ']' when nothing is open"""
+        text = ''.join(line_parts[self.scanned:])
+        for m in _BRACKET_RE.finditer(text):
+            c = m.group()
+            if c in self.closers:
+                self.stacks[c].append(self.offset + m.start())
+            else:
+                stack = self.stacks[self.openers[c]]
+                if stack:
+                    stack.pop()
+        self.scanned = len(line_parts)
+        self.offset += len(text)
+        
+        nearest, pos = None, -1
+        for opener, stack in self.stacks.items():
+            if stack and stack[-1] > pos:
+                nearest, pos = opener, stack[-1]
+        return self.closers[nearest] if nearest else ']'
+
+
+def _match_brackets(ast_nodes: List[ASTNode]) -> Dict[int, int]:
+    """Map each '[' index to its matching ']', or to the line's EOL when left open"""
+    table = {}
+    stack = []
+    for idx, node in enumerate(ast_nodes):
+        node_type = type(node)
+        if node_type is OPERAND:
+            if node.value == '[':
+                stack.append(idx)
+            elif node.value == ']' and stack:
+                table[stack.pop()] = idx
+        elif node_type is EOL:
+            for open_idx in stack:
+                table[open_idx] = idx
+            stack.clear()
+    for open_idx in stack:
+        table[open_idx] = len(ast_nodes)
+    return table
+
+
+_ANNOTATION_RE = re.compile(r'(?<=.[AT\]]):(?=[Tt])')
+
+
+def _annotation_tag(node) -> str:
+    """One-character shadow of a node for _ANNOTATION_RE"""
+    node_type = type(node)
+    if node_type is TYPE:
+        return 't'
+    if node_type is not OPERAND:
+        return '.'
+    value = node.value
+    if value == ':' or value == ']':
+        return value
+    if value in TypeSystem.BUILTIN_TYPES:
+        return 'T'
+    return 'A' if value.isalpha() else '.'
+
+
+def _annotation_sites(ast_nodes: List[ASTNode]) -> Set[int]:
+    """Indices of ':' that start a type annotation (name: type / ]: type)"""
+    shadow = ''.join(map(_annotation_tag, ast_nodes))
+    return {m.start() for m in _ANNOTATION_RE.finditer(shadow)}
+
+
+def _line_writer(out):
+    """Write each line to out, newline-separated like '\\n'.join"""
+    sep = ''
+    def write(line):
+        nonlocal sep
+        out.write(sep)
+        out.write(line)
+        sep = '\n'
+    return write
+
+
+def _for_iterable(iterable_tokens: List[ASTNode]) -> str:
+    """Python iterable for a for-loop: 'a..b' becomes an inclusive range()"""
+    # Split on the first '..' in one pass; range_end_tokens stays None without one
+    range_start_tokens = []
+    range_end_tokens = None
+    for token in iterable_tokens:
+        if isinstance(token, OPERATOR) and token.value == '..':
+            if range_end_tokens is None:
+                range_end_tokens = []
+        elif range_end_tokens is None:
+            range_start_tokens.append(token)
+        else:
+            range_end_tokens.append(token)
+    
+    if range_end_tokens is not None:
+        start_expr = ''.join(t.py_value for t in range_start_tokens)
+        end_expr = ''.join(t.py_value for t in range_end_tokens)
+        if start_expr and end_expr:
+            return f'range({start_expr}, {end_expr} + 1)'
+    return ''.join(t.py_value for t in iterable_tokens)
+
+
+def _emit_for(ast_nodes: List[ASTNode], i: int, add_part) -> int:
+    """Emit the 'for' header whose keyword is at i; returns the index of its EOL"""
+    n_nodes = len(ast_nodes)
+    add_part('for ')
+    i += 1
+    
+    while i < n_nodes:
+        if isinstance(ast_nodes[i], EOL):
+            break
+        
+        if isinstance(ast_nodes[i], KEYWORD) and ast_nodes[i].value == 'in':
+            add_part(' in ')
+            i += 1
+            
+            iterable_tokens = []
+            while i < n_nodes:
+                if isinstance(ast_nodes[i], EOL):
+                    break
+                if isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ':':
+                    break
+                iterable_tokens.append(ast_nodes[i])
+                i += 1
+            
+            add_part(_for_iterable(iterable_tokens))
+            continue
+        
+        if isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value.isalpha():
+            add_part(f'block_{ast_nodes[i].value}')
+        else:
+            add_part(ast_nodes[i].py_value)
+        i += 1
+    
+    return i
+
+
+def _emit_fn(ast_nodes: List[ASTNode], i: int, add_part, bracket_table: Dict[int, int]) -> int:
+    """Emit the 'def' header whose 'fn' keyword is at i; returns the index after it"""
+    n_nodes = len(ast_nodes)
+    add_part('def ')
+    i += 1
+    
+    if i < n_nodes and isinstance(ast_nodes[i], OPERAND):
+        func_name = ast_nodes[i].value
+        add_part(f'block_{func_name}')
+        i += 1
+    
+    if i < n_nodes and isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == '[':
+        add_part('(')
+        i += 1
+        
+        while i < n_nodes and not (isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ']'):
+            if isinstance(ast_nodes[i], EOL):
+                break
+            if isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ':':
+                # Skip type annotation (colon and type)
+                type_name, type_end = extract_type_info(ast_nodes, i, bracket_table)
+                i = type_end
+                continue
+            elif isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value.isalpha() and ast_nodes[i].value not in [',']:
+                param_name = ast_nodes[i].value
+                add_part(f'block_{param_name}')
+                i += 1
+                
+                # Check for default value (=)
+                if i < n_nodes and isinstance(ast_nodes[i], OPERATOR) and ast_nodes[i].value == '=':
+                    add_part('=')
+                    i += 1
+                    # Collect default value tokens
+                    while i < n_nodes and not (isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value in [',', ']']):
+                        if isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ':':
+                            # Skip type after default value
+                            type_name, type_end = extract_type_info(ast_nodes, i, bracket_table)
+                            i = type_end
+                            continue
+                        add_part(ast_nodes[i].py_value)
+                        i += 1
+                continue
+            elif isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ',':
+                add_part(',')
+            i += 1
+        
+        if i < n_nodes and isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ']':
+            add_part(')')
+            i += 1
+    
+    return i
+
+
+def astToPy(ast_nodes: List[ASTNode], out: Optional[TextIO] = None) -> Optional[str]:
     """
     Convert AST nodes to Python source code with type checking and identifier validation.
     Uses the .py_value of each node to generate output.
+    When out is given, lines are written to it as they are finished and None is returned.
     """
+    n_nodes = len(ast_nodes)
+    bracket_table = _match_brackets(ast_nodes)
+    annotation_sites = _annotation_sites(ast_nodes)
+    builtin_types = TypeSystem.BUILTIN_TYPES
     type_system = TypeSystem()
     collection_variables = set()
     
     # First pass: collect function and variable definitions
-    i = 0
-    while i < len(ast_nodes):
+    # Only keywords (for, fn) and names can start one
+    def_indices = [idx for idx, n in enumerate(ast_nodes) if type(n) is KEYWORD or type(n) is OPERAND]
+    for i in def_indices:
         node = ast_nodes[i]
+        node_type = type(node)
         
         # Collect loop variable definitions (for i in ...)
-        if isinstance(node, KEYWORD) and node.value == 'for':
+        if node_type is KEYWORD and node.value == 'for':
             j = i + 1
-            if j < len(ast_nodes) and isinstance(ast_nodes[j], OPERAND):
+            if j < n_nodes and isinstance(ast_nodes[j], OPERAND):
                 loop_var = ast_nodes[j].value
                 # Register as num type (default for loop variables)
                 try:
@@ -447,45 +615,45 @@ def astToPy(ast_nodes: List[ASTNode]) -> str:
                     raise e
         
         # Collect function definitions
-        if isinstance(node, KEYWORD) and node.value == 'fn':
-            if i + 1 < len(ast_nodes) and isinstance(ast_nodes[i + 1], OPERAND):
+        if node_type is KEYWORD and node.value == 'fn':
+            if i + 1 < n_nodes and isinstance(ast_nodes[i + 1], OPERAND):
                 func_name = ast_nodes[i + 1].value
                 # Find return type
                 j = i + 2
-                while j < len(ast_nodes) and not (isinstance(ast_nodes[j], OPERAND) and ast_nodes[j].value == ']'):
+                while j < n_nodes and not (isinstance(ast_nodes[j], OPERAND) and ast_nodes[j].value == ']'):
                     j += 1
                 j += 1  # skip ]
                 ret_type = 'num'
-                if j < len(ast_nodes) and isinstance(ast_nodes[j], OPERAND) and ast_nodes[j].value == ':':
-                    ret_type_name, _ = extract_type_info(ast_nodes, j)
-                    if ret_type_name in TypeSystem.BUILTIN_TYPES:
+                if j < n_nodes and isinstance(ast_nodes[j], OPERAND) and ast_nodes[j].value == ':':
+                    ret_type_name, _ = extract_type_info(ast_nodes, j, bracket_table)
+                    if ret_type_name in builtin_types:
                         ret_type = ret_type_name
                 
                 # Extract parameters (with optional default values)
                 params = []
                 param_defaults = {}  # param_name -> default_value
                 k = i + 2
-                if k < len(ast_nodes) and isinstance(ast_nodes[k], OPERAND) and ast_nodes[k].value == '[':
+                if k < n_nodes and isinstance(ast_nodes[k], OPERAND) and ast_nodes[k].value == '[':
                     k += 1
-                    while k < len(ast_nodes) and not (isinstance(ast_nodes[k], OPERAND) and ast_nodes[k].value == ']'):
+                    while k < n_nodes and not (isinstance(ast_nodes[k], OPERAND) and ast_nodes[k].value == ']'):
                         if isinstance(ast_nodes[k], OPERAND) and ast_nodes[k].value not in [',', ':']:
                             param_name = ast_nodes[k].value
                             param_type = 'num'
                             k += 1
                             
                             # Skip type annotation if present
-                            if k < len(ast_nodes) and isinstance(ast_nodes[k], OPERAND) and ast_nodes[k].value == ':':
-                                pt, type_end = extract_type_info(ast_nodes, k)
-                                if pt in TypeSystem.BUILTIN_TYPES:
+                            if k < n_nodes and isinstance(ast_nodes[k], OPERAND) and ast_nodes[k].value == ':':
+                                pt, type_end = extract_type_info(ast_nodes, k, bracket_table)
+                                if pt in builtin_types:
                                     param_type = pt
                                 k = type_end
                             
                             # Check for default value (param_name=value)
-                            if k < len(ast_nodes) and isinstance(ast_nodes[k], OPERATOR) and ast_nodes[k].value == '=':
+                            if k < n_nodes and isinstance(ast_nodes[k], OPERATOR) and ast_nodes[k].value == '=':
                                 k += 1
                                 # Collect default value tokens until comma or closing bracket
                                 default_tokens = []
-                                while k < len(ast_nodes) and not (isinstance(ast_nodes[k], OPERAND) and ast_nodes[k].value in [',', ']']):
+                                while k < n_nodes and not (isinstance(ast_nodes[k], OPERAND) and ast_nodes[k].value in [',', ']']):
                                     default_tokens.append(ast_nodes[k])
                                     k += 1
                                 default_value = ''.join(t.py_value if hasattr(t, 'py_value') else str(t) for t in default_tokens).strip()
@@ -501,24 +669,24 @@ def astToPy(ast_nodes: List[ASTNode]) -> str:
                     raise e
         
         # Collect variable definitions (with or without types)
-        if isinstance(node, OPERAND) and node.value not in ['[', ']', ',', ':', '=']:
-            if i + 1 < len(ast_nodes):
+        if node_type is OPERAND and node.value not in ['[', ']', ',', ':', '=']:
+            if i + 1 < n_nodes:
                 next_node = ast_nodes[i + 1]
                 var_name = node.value
                 
                 # Case 1: Type annotation (x:num = value)
                 if isinstance(next_node, OPERAND) and next_node.value == ':':
-                    var_type, type_end = extract_type_info(ast_nodes, i + 1)
+                    var_type, type_end = extract_type_info(ast_nodes, i + 1, bracket_table)
                     if var_type:
-                        if var_type in TypeSystem.BUILTIN_TYPES or type_system._is_collection_type(var_type):
+                        if var_type in builtin_types or type_system._is_collection_type(var_type):
                             try:
                                 type_system.define_variable(var_name, var_type)
                             except BlockError as e:
                                 raise e
                     
                     # Check if it's an assignment
-                    if type_end < len(ast_nodes) and isinstance(ast_nodes[type_end], OPERATOR) and ast_nodes[type_end].value == '=':
-                        next_token = ast_nodes[type_end + 1] if type_end + 1 < len(ast_nodes) else None
+                    if type_end < n_nodes and isinstance(ast_nodes[type_end], OPERATOR) and ast_nodes[type_end].value == '=':
+                        next_token = ast_nodes[type_end + 1] if type_end + 1 < n_nodes else None
                         if isinstance(next_token, OPERAND) and next_token.value in ['[', '(', '{']:
                             collection_variables.add(var_name)
                 
@@ -526,7 +694,7 @@ def astToPy(ast_nodes: List[ASTNode]) -> str:
                 elif isinstance(next_node, OPERATOR) and next_node.value == '=':
                     # Infer type from the value
                     value_idx = i + 2
-                    if value_idx < len(ast_nodes):
+                    if value_idx < n_nodes:
                         value_node = ast_nodes[value_idx]
                         inferred_type = infer_value_type(ast_nodes, value_idx, type_system)
                         try:
@@ -537,199 +705,83 @@ def astToPy(ast_nodes: List[ASTNode]) -> str:
                         # Track if it's a collection
                         if isinstance(value_node, OPERAND) and value_node.value in ['[', '(', '{']:
                             collection_variables.add(var_name)
-        
-        i += 1
     
     # Second pass: generate Python code with validation
     python_code = []
-    current_line = ""
+    emit = python_code.append if out is None else _line_writer(out)
+    line_parts = []
+    add_part = line_parts.append
+    is_defined_function = type_system.is_defined_function
+    is_defined_variable = type_system.is_defined_variable
+    brackets = _BracketTracker()
     i = 0
     
     in_control_flow = False
     
-    while i < len(ast_nodes):
+    while i < n_nodes:
         node = ast_nodes[i]
+        node_type = type(node)
         
-        if isinstance(node, EOL):
+        if node_type is EOL:
+            current_line = ''.join(line_parts)
+            line_parts.clear()
+            brackets.reset()
             # Add colon for control flow and function def statements
             if current_line and not current_line.rstrip().endswith(':'):
-                if any(current_line.strip().startswith(kw) for kw in ['if ', 'elif ', 'while ', 'else', 'def ']):
+                if current_line.strip().startswith(_BLOCK_OPENERS):
                     current_line += ':'
-            python_code.append(current_line)
-            current_line = ""
+            emit(current_line)
             i += 1
             continue
         
-        if isinstance(node, SPACE):
-            current_line += node.py_value
+        if node_type is SPACE:
+            add_part(node.py_value)
             i += 1
             continue
         
-        if isinstance(node, KEYWORD):
+        if node_type is KEYWORD:
             if node.value == 'fn':
-                current_line += 'def '
-                i += 1
-                
-                if i < len(ast_nodes) and isinstance(ast_nodes[i], OPERAND):
-                    func_name = ast_nodes[i].value
-                    current_line += f'block_{func_name}'
-                    i += 1
-                
-                if i < len(ast_nodes) and isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == '[':
-                    current_line += '('
-                    i += 1
-                    
-                    while i < len(ast_nodes) and not (isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ']'):
-                        if isinstance(ast_nodes[i], EOL):
-                            break
-                        if isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ':':
-                            # Skip type annotation (colon and type)
-                            type_name, type_end = extract_type_info(ast_nodes, i)
-                            i = type_end
-                            continue
-                        elif isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value.isalpha() and ast_nodes[i].value not in [',']:
-                            param_name = ast_nodes[i].value
-                            current_line += f'block_{param_name}'
-                            i += 1
-                            
-                            # Check for default value (=)
-                            if i < len(ast_nodes) and isinstance(ast_nodes[i], OPERATOR) and ast_nodes[i].value == '=':
-                                current_line += '='
-                                i += 1
-                                # Collect default value tokens
-                                while i < len(ast_nodes) and not (isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value in [',', ']']):
-                                    if isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ':':
-                                        # Skip type after default value
-                                        type_name, type_end = extract_type_info(ast_nodes, i)
-                                        i = type_end
-                                        continue
-                                    current_line += ast_nodes[i].py_value
-                                    i += 1
-                            continue
-                        elif isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ',':
-                            current_line += ','
-                        i += 1
-                    
-                    if i < len(ast_nodes) and isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ']':
-                        current_line += ')'
-                        i += 1
-                
+                i = _emit_fn(ast_nodes, i, add_part, bracket_table)
                 continue
             
             elif node.value == '->':
-                current_line += 'return '
+                add_part('return ')
                 i += 1
                 continue
             
             elif node.value == 'for':
-                current_line += 'for '
-                i += 1
-                
-                while i < len(ast_nodes):
-                    if isinstance(ast_nodes[i], EOL):
-                        break
-                    
-                    if isinstance(ast_nodes[i], KEYWORD) and ast_nodes[i].value == 'in':
-                        current_line += ' in '
-                        i += 1
-                        
-                        iterable_tokens = []
-                        while i < len(ast_nodes):
-                            if isinstance(ast_nodes[i], EOL):
-                                break
-                            if isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value == ':':
-                                break
-                            iterable_tokens.append(ast_nodes[i])
-                            i += 1
-                        
-                        has_range_operator = any(isinstance(t, OPERATOR) and t.value == '..' for t in iterable_tokens)
-                        
-                        if has_range_operator:
-                            range_start_tokens = []
-                            range_end_tokens = []
-                            found_range_op = False
-                            
-                            for token in iterable_tokens:
-                                if isinstance(token, OPERATOR) and token.value == '..':
-                                    found_range_op = True
-                                elif not found_range_op:
-                                    range_start_tokens.append(token)
-                                else:
-                                    range_end_tokens.append(token)
-                            
-                            start_expr = ''.join(t.py_value if hasattr(t, 'py_value') else str(t) for t in range_start_tokens)
-                            end_expr = ''.join(t.py_value if hasattr(t, 'py_value') else str(t) for t in range_end_tokens)
-                            
-                            if start_expr and end_expr:
-                                current_line += f'range({start_expr}, {end_expr} + 1)'
-                            else:
-                                current_line += ''.join(t.py_value if hasattr(t, 'py_value') else str(t) for t in iterable_tokens)
-                        else:
-                            current_line += ''.join(t.py_value if hasattr(t, 'py_value') else str(t) for t in iterable_tokens)
-                        
-                        continue
-                    
-                    if isinstance(ast_nodes[i], OPERAND) and ast_nodes[i].value.isalpha():
-                        current_line += f'block_{ast_nodes[i].value}'
-                    else:
-                        current_line += ast_nodes[i].py_value
-                    i += 1
-                
+                i = _emit_for(ast_nodes, i, add_part)
                 continue
             
             else:
                 # Handle other keywords (if, elif, else, while)
                 if node.value in ['if', 'elif', 'while']:
-                    current_line += node.value + ' '
+                    add_part(node.value + ' ')
                 elif node.value == 'else':
-                    current_line += node.value
+                    add_part(node.value)
                 else:
-                    current_line += node.py_value + ' '
+                    add_part(node.py_value + ' ')
                 i += 1
                 continue
         
-        if isinstance(node, TYPE):
+        if node_type is TYPE:
             i += 1
             continue
         
-        if isinstance(node, OPERAND):
+        if node_type is OPERAND:
             if node.value == ':':
-                # Only skip colons for type annotations (when preceded by variable name/closing bracket)
+                # Only skip colons for type annotations (id: type / ]: type)
                 # Keep colons for dict literals
-                if i > 0:
-                    prev = ast_nodes[i-1]
-                    # Check if this looks like a type annotation (id: type)
-                    is_type_annotation = (isinstance(prev, OPERAND) and (prev.value.isalpha() or prev.value == ']'))
-                    if is_type_annotation and i - 2 >= 0:
-                        # Additional check: see if this is followed by a known type
-                        if i + 1 < len(ast_nodes):
-                            next_node = ast_nodes[i + 1]
-                            if isinstance(next_node, TYPE) or (isinstance(next_node, OPERAND) and next_node.value in TypeSystem.BUILTIN_TYPES):
-                                type_name, type_end = extract_type_info(ast_nodes, i)
-                                i = type_end
-                                continue
+                if i in annotation_sites:
+                    type_name, type_end = extract_type_info(ast_nodes, i, bracket_table)
+                    i = type_end
+                    continue
                 # Output the colon (for dict literals)
-                current_line += ':'
+                add_part(':')
                 i += 1
                 continue
             elif node.value == '[':
                 # Handle bracket access/literals
-                bracket_content = []
-                j = i + 1
-                bracket_depth = 1
-                while j < len(ast_nodes) and bracket_depth > 0:
-                    if isinstance(ast_nodes[j], EOL):
-                        break
-                    if isinstance(ast_nodes[j], OPERAND):
-                        if ast_nodes[j].value == '[':
-                            bracket_depth += 1
-                        elif ast_nodes[j].value == ']':
-                            bracket_depth -= 1
-                            if bracket_depth == 0:
-                                break
-                    bracket_content.append(ast_nodes[j])
-                    j += 1
-                
                 prev_var_name = None
                 is_after_var = i > 0 and isinstance(ast_nodes[i-1], OPERAND) and ast_nodes[i-1].value not in ['[', ']', ',', ':', '=']
                 if is_after_var:
@@ -737,28 +789,25 @@ def astToPy(ast_nodes: List[ASTNode]) -> str:
                 
                 is_collection = prev_var_name in collection_variables if prev_var_name else False
                 
-                has_colon_pair = False
-                has_comma = False
-                is_empty = len(bracket_content) == 0
-                colon_count = 0
-                comma_count = 0
+                if is_after_var and not is_collection:
+                    # Call f[args] -> f(args); the contents need no classifying
+                    add_part('(')
+                    i += 1
+                    continue
+                
+                j = bracket_table[i]
+                bracket_content = ast_nodes[i + 1:j]
                 
-                for tok in bracket_content:
-                    if isinstance(tok, OPERAND):
-                        if tok.value == ':':
-                            colon_count += 1
-                        elif tok.value == ',':
-                            comma_count += 1
+                is_empty = len(bracket_content) == 0
+                operand_values = [tok.value for tok in bracket_content if type(tok) is OPERAND]
                 
                 # If ANY token contains a colon, it's a dict
-                if colon_count > 0:
-                    has_colon_pair = True
-                if comma_count > 0:
-                    has_comma = True
+                has_colon_pair = ':' in operand_values
+                has_comma = ',' in operand_values
                 
-                if is_after_var and is_collection:
+                if is_after_var:
                     if is_empty:
-                        current_line += '[:]'
+                        add_part('[:]')
                         i = j + 1
                         continue
                     elif has_comma and not has_colon_pair:
@@ -776,120 +825,68 @@ def astToPy(ast_nodes: List[ASTNode]) -> str:
                         if len(slice_parts) == 2:
                             start_expr = ''.join(t.py_value for t in slice_parts[0])
                             end_expr = ''.join(t.py_value for t in slice_parts[1])
-                            current_line += f'[{start_expr}:{end_expr}+1]'
+                            add_part(f'[{start_expr}:{end_expr}+1]')
                             i = j + 1
                             continue
                         else:
-                            current_line += '['
+                            add_part('[')
                     else:
-                        current_line += '['
-                elif is_after_var:
-                    current_line += '('
+                        add_part('[')
                 else:
                     # Standalone bracket (not after variable)
                     if has_colon_pair:
                         # Has colons = dict
-                        current_line += '{'
+                        add_part('{')
                     else:
-                        # No colons = list (will validate for unhashable types)
-                        # Check if list contains unhashable types (dicts)
-                        has_dict = False
-                        depth = 0
-                        for idx, tok in enumerate(bracket_content):
-                            if isinstance(tok, OPERAND) and tok.value == '[':
-                                depth += 1
-                                # Check if next tokens have a colon (dict inside)
-                                for inner_idx in range(idx + 1, len(bracket_content)):
-                                    inner = bracket_content[inner_idx]
-                                    if isinstance(inner, OPERAND) and inner.value == ']':
-                                        break
-                                    if isinstance(inner, OPERAND) and inner.value == ':':
-                                        has_dict = True
-                                        break
-                            elif isinstance(tok, OPERAND) and tok.value == ']':
-                                depth -= 1
-                        
-                        if has_dict:
-                            raise BlockError("Cannot use dict (unhashable) type in set/list literal")
-                        current_line += '['
+                        # No colons = list; has_colon_pair covers nested brackets too,
+                        # so no dict can hide inside
+                        add_part('[')
             elif node.value == ']':
-                paren_count = 0
-                bracket_count = 0
-                brace_count = 0
-                for c in reversed(current_line):
-                    if c == ')':
-                        paren_count += 1
-                    elif c == '(':
-                        paren_count -= 1
-                        if paren_count < 0:
-                            current_line += ')'
-                            break
-                    elif c == ']':
-                        bracket_count += 1
-                    elif c == '[':
-                        bracket_count -= 1
-                        if bracket_count < 0:
-                            current_line += ']'
-                            break
-                    elif c == '}':
-                        brace_count += 1
-                    elif c == '{':
-                        brace_count -= 1
-                        if brace_count < 0:
-                            current_line += '}'
-                            break
-                else:
-                    if paren_count < 0:
-                        current_line += ')'
-                    elif brace_count < 0:
-                        current_line += '}'
-                    else:
-                        current_line += ']'
+                add_part(brackets.closer(line_parts))
             elif node.value.isalpha() or node.value == '_':
                 # Identifier - check if defined and add block_ prefix
-                if node.value not in [',']:
-                    # Check if builtin constant first
-                    if node.value in TypeSystem.BUILTIN_CONSTANTS:
-                        _, py_value = TypeSystem.BUILTIN_CONSTANTS[node.value]
-                        current_line += py_value
-                    # Check if builtin function
-                    elif node.value in TypeSystem.BUILTIN_FUNCTIONS:
-                        current_line += node.value
-                    # Check next token to see if it's a function call or variable use
-                    elif i + 1 < len(ast_nodes):
-                        next_token = ast_nodes[i + 1]
-                        if isinstance(next_token, OPERATOR) and next_token.value == '(':
-                            # Function call with ()
-                            if not type_system.is_defined_function(node.value):
-                                raise BlockError(f"Undefined function '{node.value}'")
-                            current_line += f'block_{node.value}'
-                        elif isinstance(next_token, OPERATOR) and next_token.value == '=':
-                            # Variable assignment (new definition)
-                            current_line += f'block_{node.value}'
-                        elif isinstance(next_token, OPERAND) and next_token.value == ':':
-                            # Type annotation - just output the identifier, type will be skipped
-                            current_line += f'block_{node.value}'
-                        else:
-                            # Variable use
-                            if not type_system.is_defined_variable(node.value) and not type_system.is_defined_function(node.value):
-                                raise BlockError(f"Undefined identifier '{node.value}'")
-                            else:
-                                current_line += f'block_{node.value}'
+                # Builtin constants and functions map straight to their Python name
+                builtin_py = _BUILTIN_IDENTS.get(node.value)
+                if builtin_py is not None:
+                    add_part(builtin_py)
+                # Check next token to see if it's a function call or variable use
+                elif i + 1 < n_nodes:
+                    next_token = ast_nodes[i + 1]
+                    if isinstance(next_token, OPERATOR) and next_token.value == '(':
+                        # Function call with ()
+                        if not is_defined_function(node.value):
+                            raise BlockError(f"Undefined function '{node.value}'")
+                        add_part(f'block_{node.value}')
+                    elif isinstance(next_token, OPERATOR) and next_token.value == '=':
+                        # Variable assignment (new definition)
+                        add_part(f'block_{node.value}')
+                    elif isinstance(next_token, OPERAND) and next_token.value == ':':
+                        # Type annotation - just output the identifier, type will be skipped
+                        add_part(f'block_{node.value}')
                     else:
-                        current_line += f'block_{node.value}'
+                        # Variable use
+                        if not is_defined_variable(node.value) and not is_defined_function(node.value):
+                            raise BlockError(f"Undefined identifier '{node.value}'")
+                        else:
+                            add_part(f'block_{node.value}')
+                else:
+                    add_part(f'block_{node.value}')
             else:
-                current_line += node.py_value
+                add_part(node.py_value)
         else:
-            current_line += node.py_value
+            add_part(node.py_value)
         
         i += 1
     
+    current_line = ''.join(line_parts)
     if current_line:
-        python_code.append(current_line)
+        emit(current_line)
     
-    return '\n'.join(python_code)
+    if out is None:
+        return '\n'.join(python_code)
 
 
+@lru_cache(maxsize=128)
 def transpile(source: str) -> str:
     """
     Main transpiler function.
@@ -906,40 +903,110 @@ def transpile(source: str) -> str:
         raise BlockError(f"Transpilation error: {str(e)}")
 
 
+def transpile_to(source: str, out: TextIO) -> None:
+    """
+    Streaming variant of transpile().
+    Converts Block source code to Python with type checking and identifier validation,
+    writing each line to out as it is produced.
+    """
+    try:
+        lines = sourceToLine(source)
+        ast_nodes = linesToAst(lines)
+        astToPy(ast_nodes, out)
+    except BlockError as e:
+        raise e
+    except Exception as e:
+        raise BlockError(f"Transpilation error: {str(e)}")
+
+
+_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'block_transpiler')
+
+
+def _file_digest(*paths: str) -> bytes:
+    """BLAKE2b digest over the contents of the given files."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+_CACHE_SALT = _file_digest(__file__, block_builtins.__file__)
+
+
+def transpile_cached(source: str) -> str:
+    """
+    On-disk memoized variant of transpile().
+    Output is stored under _CACHE_DIR, keyed by a hash of the source, of this transpiler and of block_builtins.
+    """
+    key = hashlib.blake2b(_CACHE_SALT, digest_size=16)
+    key.update(source.encode())
+    cache_file = os.path.join(_CACHE_DIR, key.hexdigest() + '.py')
+    
+    try:
+        with open(cache_file, 'r') as f:
+            return f.read()
+    except OSError:
+        pass
+    
+    python_code = transpile(source)
+    tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        with open(tmp_file, 'w') as f:
+            f.write(python_code)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return python_code
+
+
 def main():
     """CLI interface for the Block transpiler"""
-    if len(sys.argv) < 2:
-        print("Usage: python block_transpiler.py <input.block> [output.py]")
-        print("   or: python block_transpiler.py -c '<block code>'")
+    use_cache = '--cache' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--cache']
+    
+    if len(args) < 1:
+        print("Usage: python block_transpiler.py [--cache] <input.block> [output.py]")
+        print("   or: python block_transpiler.py [--cache] -c '<block code>'")
         sys.exit(1)
     
-    if sys.argv[1] == '-c':
-        if len(sys.argv) < 3:
+    if args[0] == '-c':
+        if len(args) < 2:
             print("Error: -c requires code argument")
             sys.exit(1)
         
-        source = sys.argv[2]
+        source = args[1]
         try:
-            python_code = transpile(source)
+            python_code = transpile_cached(source) if use_cache else transpile(source)
             print(python_code)
         except BlockError as e:
             print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
     else:
-        input_file = sys.argv[1]
-        output_file = sys.argv[2] if len(sys.argv) > 2 else input_file.replace('.block', '.py')
+        input_file = args[0]
+        output_file = args[1] if len(args) > 1 else input_file.replace('.block', '.py')
         
         try:
             with open(input_file, 'r') as f:
                 source = f.read()
             
-            python_code = transpile(source)
             with open("block_builtins.py", 'r') as f:
                 b = f.read()
-            python_code = b + '\n' + python_code
             
-            with open(output_file, 'w') as f:
-                f.write(python_code)
+            tmp_file = output_file + '.tmp'
+            try:
+                with open(tmp_file, 'w') as f:
+                    f.write(b + '\n')
+                    if use_cache:
+                        f.write(transpile_cached(source))
+                    else:
+                        transpile_to(source, f)
+                os.replace(tmp_file, output_file)
+            finally:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
             
             print(f"Successfully transpiled {input_file} -> {output_file}")
         except FileNotFoundError:
@@ -0,0 +1,196 @@
+import asyncio
+import unittest
+
+import block_builtins as bb
+
+
+class AsyncBuiltinsTest(unittest.TestCase):
+    def test_aRun_returns_coroutine_result(self):
+        async def answer(): return 42
+        self.assertEqual(bb.aRun(answer()), 42)
+
+    def test_aRun_calls_coroutine_functions(self):
+        async def answer(): return 'ok'
+        self.assertEqual(bb.aRun(answer), 'ok')
+
+    def test_aRun_uses_a_fresh_loop_per_call(self):
+        async def current_loop(): return asyncio.get_running_loop()
+        first = bb.aRun(current_loop())
+        second = bb.aRun(current_loop())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed())
+
+    def test_aRun_inside_running_loop_schedules_a_task(self):
+        async def inner(): return 7
+        async def outer():
+            task = bb.aRun(inner())
+            self.assertIsInstance(task, asyncio.Task)
+            return await task
+        self.assertEqual(bb.aRun(outer()), 7)
+
+    def test_aRun_wraps_errors_from_callables(self):
+        def broken(): raise ValueError('boom')
+        with self.assertRaises(bb.BlockError):
+            bb.aRun(broken)
+
+    def test_aCreateTask_starts_the_task(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        asyncio.set_event_loop(loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        started = []
+        async def job():
+            started.append(True)
+            return 1
+        task = bb.aCreateTask(job())
+        self.assertIsInstance(task, asyncio.Task)
+        self.assertEqual(started, [True])
+        self.assertEqual(loop.run_until_complete(task), 1)
+
+    def test_aIsCoroutine(self):
+        async def coro_fn(): pass
+        coro = coro_fn()
+        self.assertIs(bb.aIsCoroutine(coro_fn), bb.TRUE)
+        self.assertIs(bb.aIsCoroutine(coro), bb.TRUE)
+        self.assertIs(bb.aIsCoroutine(len), bb.FALSE)
+        coro.close()
+
+
+class ConstantsTest(unittest.TestCase):
+    def test_booleans_are_singletons(self):
+        self.assertIs(bb.boolean(True), bb.TRUE)
+        self.assertIs(bb.boolean(), bb.FALSE)
+        self.assertIs(bb.toBool([1]), bb.TRUE)
+        self.assertIs(bb.toBool(''), bb.FALSE)
+        self.assertIs(bb.strStartsWith('abc', 'a'), bb.TRUE)
+        self.assertIs(bb.colIsEmtpy([1]), bb.FALSE)
+
+    def test_booleans_print_lowercase(self):
+        self.assertEqual(str(bb.TRUE), 'true')
+        self.assertEqual(repr(bb.FALSE), 'false')
+        self.assertEqual(bb.toStr(bb.TRUE), 'true')
+        self.assertEqual(bb.TRUE + 1, 2)
+
+    def test_none_equals_and_hashes_like_None(self):
+        self.assertIs(bb.none(), bb.NONE)
+        self.assertTrue(bb.NONE == None)
+        self.assertFalse(bb.NONE != None)
+        self.assertTrue(bb.NONE != 0)
+        self.assertFalse(bb.NONE)
+        self.assertEqual(hash(bb.NONE), hash(None))
+        self.assertEqual({bb.NONE: 1}[None], 1)
+
+
+class CollectionTest(unittest.TestCase):
+    def test_filter_and_apply_keep_the_collection_type(self):
+        keep = lambda x: x > 1
+        double = lambda x: x * 2
+        self.assertEqual(bb.colFilter((1, 2, 3), keep), (2, 3))
+        self.assertEqual(bb.colApplyF((1, 2), double), (2, 4))
+        self.assertEqual(bb.colFilter([1, 2, 3], keep), [2, 3])
+        self.assertEqual(bb.colApplyF({1, 2}, double), {2, 4})
+        self.assertEqual(bb.colFilter('abc', lambda c: c != 'b'), 'ac')
+        self.assertEqual(bb.colFilter({'a': 1, 'b': 2}, lambda k, v: v > 1), {'b': 2})
+        self.assertEqual(bb.colApplyF({'a': 1}, double), {'a': 2})
+
+    def test_colFilter_rejects_non_callable_predicate(self):
+        for pred in (None, 1, 'x'):
+            with self.subTest(pred=pred):
+                with self.assertRaises(bb.BlockError):
+                    bb.colFilter([0, 1], pred)
+
+    def test_toMap_requires_pairs(self):
+        self.assertEqual(bb.toMap([('a', 1), ['b', 2]]), {'a': 1, 'b': 2})
+        for value in (['ab', 'cd'], ('xy',), [(1, 2, 3)]):
+            with self.subTest(value=value):
+                with self.assertRaises(bb.BlockError):
+                    bb.toMap(value)
+
+
+    def test_frozenset_round_trips_through_toSet(self):
+        frozen = frozenset({1})
+        self.assertEqual(bb.typeOf(frozen), 'set')
+        thawed = bb.toSet(frozen)
+        self.assertEqual(bb.setAdd(thawed, 2), {1, 2})
+        self.assertEqual(bb.setRemove(thawed, 1), {2})
+        self.assertEqual(frozen, frozenset({1}))
+        plain = {3}
+        self.assertIs(bb.toSet(plain), plain)
+
+
+class GuardTest(unittest.TestCase):
+    def test_str_builtins_reject_other_types(self):
+        for fn in (bb.strLen, bb.strStrip, bb.strToUpper, bb.strSplit):
+            with self.subTest(fn=fn.__name__):
+                with self.assertRaises(bb.BlockError):
+                    fn(3)
+
+    def test_strFind_and_strCount(self):
+        self.assertEqual(bb.strFind('abcb', 'b'), 1)
+        self.assertEqual(bb.strCount('abcb', 'b'), 2)
+        for fn in (bb.strFind, bb.strCount):
+            with self.subTest(fn=fn.__name__):
+                with self.assertRaises(bb.BlockError):
+                    fn(3, 'b')
+                with self.assertRaises(TypeError):
+                    fn('abcb', 'b', 1)
+
+    def test_map_builtins(self):
+        self.assertEqual(bb.mapKeys({'a': 1}), ['a'])
+        self.assertEqual(list(bb.mapItemsView({'a': 1})), [('a', 1)])
+        with self.assertRaises(bb.BlockError):
+            bb.mapKeys([])
+
+
+class ToNumTest(unittest.TestCase):
+    def test_whole_numbers_stay_int(self):
+        for value in (10, '10', ' -7 ', '+3', bb.TRUE):
+            with self.subTest(value=value):
+                self.assertIs(type(bb.toNum(value)), int)
+        self.assertEqual(bb.toNum('-7'), -7)
+        self.assertEqual(bb.toNum(10), bb.toNum('10'))
+
+    def test_fractions_are_float(self):
+        self.assertEqual(bb.toNum(2.5), 2.5)
+        self.assertEqual(bb.toNum('2.5'), 2.5)
+        self.assertEqual(bb.toNum('1e3'), 1000.0)
+        self.assertIs(type(bb.toNum('1e3')), float)
+
+    def test_invalid_input_raises(self):
+        for value in ('', '-', 'abc', None, [1]):
+            with self.subTest(value=value):
+                with self.assertRaises(bb.BlockError):
+                    bb.toNum(value)
+
+    def test_colOfNums_matches_toNum(self):
+        self.assertEqual(bb.colOfNums(1, 3), (1, 2, 3))
+        # The default func=toNum yields ints now, not the floats it used to
+        self.assertEqual({type(n) for n in bb.colOfNums(1, 3)}, {int})
+        self.assertEqual({type(n) for n in bb.colOfNums(1, 3, 1, float)}, {float})
+        self.assertEqual(bb.colOfNums(1, 3), tuple(map(bb.toNum, range(1, 4))))
+        self.assertEqual(bb.colOfNums(1, 3, 1, float), (1.0, 2.0, 3.0))
+
+
+class NumListTest(unittest.TestCase):
+    def test_list_builtins_accept_numlist(self):
+        nums = bb.toNumList([1, 2])
+        self.assertEqual(list(bb.listAppend(nums, 3)), [1.0, 2.0, 3.0])
+        self.assertEqual(list(bb.listExtend(nums, [4])), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(bb.listPop(nums), 4.0)
+        self.assertEqual(bb.typeOf(nums), 'list')
+
+    def test_non_num_into_numlist_raises_block_error(self):
+        nums = bb.toNumList([1])
+        with self.assertRaises(bb.BlockError):
+            bb.listAppend(nums, 'x')
+        with self.assertRaises(bb.BlockError):
+            bb.listExtend(nums, ['x'])
+
+    def test_plain_arrays_are_not_lists(self):
+        from array import array
+        with self.assertRaises(bb.BlockError):
+            bb.listAppend(array('i'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
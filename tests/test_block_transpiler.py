@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import block_builtins
+import block_transpiler
+import block_type_Based
+
+
+class NumberLiteralTest(unittest.TestCase):
+    def test_number_py_value_is_text(self):
+        for module in (block_transpiler, block_type_Based):
+            with self.subTest(module=module.__name__):
+                self.assertEqual(module.NUMBER(5).py_value, '5')
+                self.assertEqual(module.NUMBER(2.5).py_value, '2.5')
+
+    def test_numeric_source_transpiles(self):
+        source = 'x = 5\necho(x + 1.5)'
+        self.assertEqual(block_transpiler.transpile(source), 'x=5\necho(x+1.5)')
+        self.assertEqual(block_type_Based.transpile(source), 'block_x=5\necho(block_x+1.5)')
+
+
+class TranspileCacheTest(unittest.TestCase):
+    def test_cached_output_matches_and_is_reused(self):
+        source = 'x = [1, 2]\necho(x)'
+        for module in (block_transpiler, block_type_Based):
+            with self.subTest(module=module.__name__), tempfile.TemporaryDirectory() as cache_dir:
+                with mock.patch.object(module, '_CACHE_DIR', cache_dir):
+                    expected = module.transpile(source)
+                    self.assertEqual(module.transpile_cached(source), expected)
+                    entries = os.listdir(cache_dir)
+                    self.assertEqual(len(entries), 1)
+                    self.assertTrue(entries[0].endswith('.py'))
+
+                    # A hit is served from disk without transpiling again
+                    with mock.patch.object(module, 'transpile', side_effect=AssertionError):
+                        self.assertEqual(module.transpile_cached(source), expected)
+
+    def test_different_sources_get_different_entries(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.object(block_transpiler, '_CACHE_DIR', cache_dir):
+                block_transpiler.transpile_cached('x = 1')
+                block_transpiler.transpile_cached('x = 2')
+                self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_typed_cache_key_covers_builtins(self):
+        expected = block_type_Based._file_digest(block_type_Based.__file__, block_builtins.__file__)
+        self.assertEqual(block_type_Based._CACHE_SALT, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()